@@ -0,0 +1,27 @@
+-- how long each phase of each CleoDBImport took; see
+-- forecasts/ImportTimings.py, and CleoDBImport.timingsToDB
+-- Like forecasts, rows point to import_times and forecast_times by id.
+
+CREATE SEQUENCE import_timings_id_seq
+    INCREMENT BY 1
+    NO MAXVALUE
+    NO MINVALUE
+    CACHE 1;
+
+CREATE TABLE import_timings (
+    id integer DEFAULT nextval('import_timings_id_seq'::regclass) NOT NULL,
+    import_time_id integer NOT NULL,
+    forecast_time_id integer NOT NULL,
+    phase character varying(64) NOT NULL,
+    seconds double precision NOT NULL,
+    rows integer,
+    queries integer
+);
+
+ALTER TABLE public.import_timings OWNER TO dss;
+ALTER TABLE public.import_timings_id_seq OWNER TO dss;
+ALTER SEQUENCE import_timings_id_seq OWNED BY import_timings.id;
+
+ALTER TABLE ONLY import_timings
+    ADD CONSTRAINT import_timings_pkey PRIMARY KEY (id);
+CREATE INDEX import_timings_import_time_id ON import_timings USING btree (import_time_id);
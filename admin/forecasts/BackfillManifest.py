@@ -0,0 +1,118 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from datetime import datetime
+import json
+import os
+
+class BackfillManifest:
+
+    """
+    A persistent record of a CLEO backfill, so that it can be stopped and
+    restarted without redoing the forecast times it has already finished.
+    The manifest is a JSON file holding three lists of forecast times:
+       * completed - imported successfully (or found already in the DB)
+       * failed    - the last import attempt failed; these get retried
+       * pending   - asked for, but not attempted yet
+    along with the traceback of each failure.  The file is rewritten
+    after every change, via a temporary file and a rename, so an
+    interrupted backfill never leaves behind a half written manifest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = set()
+        self.failed    = {}
+        self.pending   = set()
+        if os.path.exists(path):
+            self.load()
+
+    def key(self, dt):
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    def dt(self, key):
+        return datetime.strptime(key, "%Y-%m-%d %H:%M:%S")
+
+    def load(self):
+        f = open(self.path, 'r')
+        manifest = json.load(f)
+        f.close()
+        self.completed = set(manifest["completed"])
+        self.failed    = dict([(ft, error) \
+            for ft, error in manifest["failed"]])
+        self.pending   = set(manifest["pending"])
+
+    def save(self):
+        manifest = {"completed" : sorted(self.completed)
+                  , "failed"    : sorted(self.failed.items())
+                  , "pending"   : sorted(self.pending)
+                   }
+        tmp = self.path + ".tmp"
+        f = open(tmp, 'w')
+        json.dump(manifest, f, indent = 1)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.rename(tmp, self.path)
+
+    def add(self, forecast_times):
+        "Asks for the given forecast times, unless they're already done."
+        for ft in forecast_times:
+            key = self.key(ft)
+            if key not in self.completed and not self.failed.has_key(key):
+                self.pending.add(key)
+        self.save()
+
+    def setCompleted(self, forecast_times):
+        for ft in forecast_times:
+            key = self.key(ft)
+            self.pending.discard(key)
+            self.failed.pop(key, None)
+            self.completed.add(key)
+        self.save()
+
+    def setFailed(self, forecast_time, error):
+        key = self.key(forecast_time)
+        self.pending.discard(key)
+        self.failed[key] = error
+        self.save()
+
+    def isCompleted(self, forecast_time):
+        return self.key(forecast_time) in self.completed
+
+    def getCompleted(self):
+        return [self.dt(ft) for ft in sorted(self.completed)]
+
+    def getFailed(self):
+        return sorted([(self.dt(ft), error) \
+            for ft, error in self.failed.items()])
+
+    def getTodo(self, forecast_times = None):
+        """
+        The forecast times still to be imported, in order: those pending
+        and those that failed last time.  Optionally restricted to the
+        given forecast times.
+        """
+        todo = self.pending.union(self.failed.keys())
+        if forecast_times is not None:
+            todo = todo.intersection([self.key(ft) for ft in forecast_times])
+        return [self.dt(ft) for ft in sorted(todo)]
@@ -0,0 +1,71 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from datetime       import datetime
+from CleoStartTimes import CleoStartTimes
+import pg
+import settings
+
+class BackfillPlanner:
+
+    """
+    Works out which forecast times a backfill should import: those that
+    cleo has archived NAM input for (see CleoStartTimes), but that the
+    DB doesn't have forecasts for yet.  That way cleo never gets run for
+    forecast times that can't succeed, or that are already done.
+    """
+
+    def __init__(self, database, startTimes = None):
+        self.database = database
+        self.startTimes = startTimes if startTimes is not None \
+                                     else CleoStartTimes()
+
+    def getAvailable(self, start, end):
+        "The archived forecast times from start up to end."
+        return self.startTimes.getRange(start, end)
+
+    def getImported(self, start, end):
+        """
+        The forecast times from start up to end that already have
+        forecasts in the DB, from a single query.
+        """
+        c = pg.connect(user = "dss", dbname = self.database, port = settings.DATABASE_PORT)
+        r = c.query("""
+                    SELECT ft.date
+                    FROM forecast_times AS ft
+                    WHERE ft.date >= '%s' AND ft.date < '%s'
+                      AND EXISTS (SELECT 1 FROM forecasts AS f
+                                  WHERE f.forecast_time_id = ft.id)
+                    """ % (start, end))
+        c.close()
+        return [datetime.strptime(row['date'], "%Y-%m-%d %H:%M:%S") \
+            for row in r.dictresult()]
+
+    def plan(self, start, end, imported = None):
+        """
+        The forecast times from start up to end that are available but
+        not yet imported, in order.  Pass in what getImported returned,
+        if you already have it.
+        """
+        if imported is None:
+            imported = self.getImported(start, end)
+        return sorted(set(self.getAvailable(start, end)).difference(imported))
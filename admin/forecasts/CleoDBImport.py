@@ -21,10 +21,21 @@
 #       Green Bank, WV 24944-0002 USA
 
 from DBImport        import DBImport
-from os              import listdir, system
+from CleoOutputFile  import CleoOutputFile
+from ForecastBatch   import ForecastBatch, NO_FORECAST_TYPE
+from ImportTimings   import ImportTimings, QueryCounter
+from os              import listdir, makedirs
+from os.path         import basename
 from datetime        import datetime, timedelta
 from utilities.emailNotifier   import emailNotifier
+from utilities.DateRegistry    import DateRegistry
 import sys
+import shlex
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
 from utilities import TimeAgent
 import pg
 import settings
@@ -34,23 +45,46 @@ FORECASTDELTA = 6
 SIXDELTASTART = 1
 MAXFORECASTTYPE = SIXDELTASTART + MAXFORECASTHOURS/FORECASTDELTA
 
+# how long (seconds) we give cleo before giving up on it
+CLEOTIMEOUT = 2 * 60 * 60
+
 # headers to be found on first line of each file
 # freqFileHeader is at the bottom of this file - line too long for editor!
 windFileHeader = "timeListMJD pwatTimeList_avrg smphTimeList_avrg smph75mTimeList_avrg drctTimeList_avrg presTimeList_avrg tmpcTimeList_avrg humidTimeList_avrg dwpcTimeList_avrg LCLDTimeList_avrg MCLDTimeList_avrg HCLDTimeList_avrg P0*MTimeList_avrg C0*MTimeList_avrg cfrlMaxTimeList_avrg LWDTimeList_avrg"
 
+class CleoCommandError(Exception):
+    "A call to cleo failed, or didn't finish in time."
+    pass
+
 class CleoDBImport:
 
-    def __init__(self, forecast_time, dbname, path = ".", history = False):
+    def __init__(self, forecast_time, dbname, path = ".", history = False
+               , bulk = False):
         
-        # cleo forecast files get written to our current directory,
-        # but we might want to override that for testing
+        # cleo forecast files get written to a scratch directory under
+        # our current directory, but we might want to override that
+        # for testing
         self.path     = path
+        self.runDir   = None
+        # once we're done with the scratch directory, keep a compressed
+        # copy of it, or just delete it?
+        self.archive  = False
+        # an optional CleoOutputCache: historical imports that have been
+        # done before can then skip calling cleo
+        self.cache    = None
+        # the (key, file) of cleo output that's only cached once we've
+        # parsed it, so that bad output doesn't get reused
+        self.toCache  = []
 
         self.dbname        = dbname
         self.dbimport      = DBImport()
         self.forecast_time = forecast_time
         self.history       = history
 
+        # write the whole import with a few multi-row statements inside
+        # of one transaction, rather than row by row?
+        self.bulk          = bulk
+
         # take note of when this import is happening
         self.import_time = datetime.utcnow().replace(second = 0
                                                    , microsecond = 0)
@@ -58,11 +92,15 @@ class CleoDBImport:
         self.files = {}
         self.report = []
         self.quiet = False
+        # how long each phase took; also write them to the DB?
+        self.timings = ImportTimings()
+        self.timingsToDB = False
 
         self.initCleoCommandLines()
+        self.cleoTimeout = CLEOTIMEOUT
 
         # This is a mapping of column names in the wind file header, to the
-        # name of where we store it in our internal data dictionary
+        # name of the column we store it in in our ForecastBatch
         # This makes adding new quantities easy.
         self.windFileCols = [("smphTimeList_avrg", "speed_mph")
                            , ("LWDTimeList_avrg", "irradiance")
@@ -132,42 +170,110 @@ class CleoDBImport:
         else:
             return SIXDELTASTART
         
-    def getWeather(self):
-        "Make actual calls to cleo to populate weather data files."
+    def getCleoCmdLines(self):
+        "Our cleo calls, by the name of the directory each one runs in."
+        return [("atmo", self.atmoCmdLine), ("wind", self.windCmdLine)]
 
-        print self.atmoCmdLine
-        system(self.atmoCmdLine)
-
-        print self.windCmdLine
-        system(self.windCmdLine)
+    def getWeather(self, cmdLines = None):
+        """
+        Make actual calls to cleo to populate weather data files.
+        The calls don't depend on each other, so they run at the
+        same time.
+        """
 
         # where are the files?  See the cleo help:
         # "The results of this program are a set of files that are 
         # placed in a newly-created subdirectory of the current dir."
+        # So each call gets its own current dir, in our scratch dir,
+        # keeping them apart from each other and from other imports.
+        if self.runDir is None:
+            self.makeRunDir()
+        self.cleoStarts = {}
+        procs = []
+        try:
+            if cmdLines is None:
+                cmdLines = self.getCleoCmdLines()
+            for name, cmdLine in cmdLines:
+                print cmdLine
+                procs.append(self.startCleo(name, cmdLine))
+            self.waitForCleo(procs)
+        finally:
+            for name, p, err in procs:
+                if p.poll() is None:
+                    p.kill()
+                    p.wait()
+                err.close()
+
+    def makeRunDir(self):
+        "A scratch directory for just this import's cleo output."
+        prefix = "CleoRun_%s_" % \
+            datetime.strftime(self.forecast_time, "%Y_%m_%d_%H")
+        self.runDir = tempfile.mkdtemp(prefix = prefix, dir = self.path)
+
+    def cleanUpRunDir(self):
+        "Archives (compressed), or just deletes, our scratch directory."
+        if self.runDir is None:
+            return
+        if self.archive:
+            tarPath = self.runDir + ".tar.gz"
+            tar = tarfile.open(tarPath, "w:gz")
+            tar.add(self.runDir, arcname = basename(self.runDir))
+            tar.close()
+            self.reportLine("Archived cleo files to %s\n" % tarPath)
+        shutil.rmtree(self.runDir)
+        self.runDir = None
+
+    def startCleo(self, name, cmdLine):
+        "Starts a cleo command line in its own directory."
+        dir = self.runDir + "/" + name
+        makedirs(dir)
+        err = tempfile.TemporaryFile()
+        self.cleoStarts[name] = time.time()
+        p = subprocess.Popen(shlex.split(cmdLine), cwd = dir, stderr = err)
+        return (name, p, err)
+
+    def waitForCleo(self, procs):
+        """
+        Waits for the given cleo processes to finish, and makes sure
+        they all did so in time and without complaint.
+        """
+        deadline = time.time() + self.cleoTimeout
+        running = list(procs)
+        while True:
+            # note how long each call took, as it finishes
+            for proc in list(running):
+                name, p, _ = proc
+                if p.poll() is not None:
+                    self.timings.add("cleo %s" % name
+                                   , time.time() - self.cleoStarts[name])
+                    running.remove(proc)
+            if not running:
+                break
+            if time.time() > deadline:
+                raise CleoCommandError("cleo did not finish within %d seconds" % self.cleoTimeout)
+            time.sleep(1)
+
+        for name, p, err in procs:
+            err.seek(0)
+            stderr = err.read().strip()
+            if stderr:
+                self.reportLine("cleo (%s) stderr: %s" % (name, stderr))
+            if p.returncode != 0:
+                raise CleoCommandError("cleo (%s) exited with status %d: %s" % \
+                    (name, p.returncode, stderr))
 
     def read(self, forecast_file, wind_file):
         """
         Given the existence of cleo data files, parse the files into a
-        data dictionary.
+        batch of forecasts.
         """
 
-        # init the data dictionary we will be writting to
-        self.data = {}
-        
         # we use a similar method for parsing each file, but there are enough
-        # exceptions to warrant separate functions
+        # exceptions to warrant separate functions: the wind file
+        # decides which hours are in the batch.
         self.readWindFile(wind_file)
         self.readAtmoFile(forecast_file)
 
-        # Note: we are changing our dictionary to an ordered list
-        # why not just create the new ordered list?
-        # i.e., self.data[time index][0] = timestamp
-        # or self.data[time index][1][keyword][maybe freq] = value
-        # This works, and performance isn't an issue.
-        self.data = [(timestamp, values) \
-            for timestamp, values in self.data.items()]
-        self.data.sort(key = lambda x: x[0])
-
     def readWindFile(self, file):
         """
         Parsing this file is straight forward: we'll need the timestamp
@@ -176,40 +282,28 @@ class CleoDBImport:
 
         # read cleo forecast (ground)
         print 'Process cleo forecast data (ground) ...', file
-        f          = open(file, 'r')
-        lines      = f.readlines()
-        header     = lines[0]
-        assert header.strip() == windFileHeader.strip()  
+        started = self.timings.start("parse wind")
+        f = CleoOutputFile(file, windFileHeader)
+        timestamps = f.hours()
 
-        for line in lines[1:]:
-            row = line.split(' ')
-            timestamp = TimeAgent.hour(TimeAgent.mjd2dt(float(row[0]))) #mjd
-            self.data[timestamp] = {}
+        # what forecast type will each hour be?
+        forecast_type_ids = [self.getForecastTypeIdFromTimestamp(t) \
+            for t in timestamps]
+        self.data = ForecastBatch(timestamps, forecast_type_ids, self.atmoFreqs)
 
-            # what forecast type will this be?
-            self.data[timestamp]['forecast_type_id'] = \
-                self.getForecastTypeIdFromTimestamp(timestamp)
-
-            self.readWindFileValues(header, timestamp, row)
-
-            # Note: we'll stop doing this eventually, but for now:
-            # need to insert a corrected wind speed into the DB.
-            speed_mph = self.data[timestamp]['speed_mph']
-            self.data[timestamp]['speed_ms'] = \
-                self.dbimport.correctWindSpeed(timestamp
-                                             , self.mph2mps(speed_mph))
-
-        f.close()
-
-    def readWindFileValues(self, header, timestamp, row):
-        "Uses the mapping of file headers to data dict to grab values"
+        # Ex: self.windFileCols = [("smphTimeList_avrg", "speed_mph")]
+        order = [self.data.index[t] for t in timestamps]
+        for colName, dataName in self.windFileCols:
+            getattr(self.data, dataName)[order] = f.column(colName)
+        self.timings.stop(started, rows = len(f))
 
-        #Ex: self.windFileCols = [("smphTimeList_avrg", "speed_mph")]
+        # Note: we'll stop doing this eventually, but for now:
+        # need to insert a corrected wind speed into the DB.
+        started = self.timings.start("wind correction")
+        self.data.speed_ms[:] = self.dbimport.correctWindSpeeds( \
+            self.data.timestamps, self.mph2mps(self.data.speed_mph))
+        self.timings.stop(started, rows = len(self.data))
 
-        for colName, dataName in self.windFileCols:
-            col = header.split(' ').index(colName)
-            self.data[timestamp][dataName] = float(row[col])
-            
     def readAtmoFile(self, file):
         """
         Parsing this file is more complicated, because each row contains
@@ -218,34 +312,38 @@ class CleoDBImport:
 
         # read cleo forecast (atmosphere)
         print 'Process cleo forecast data (atmosphere) ... ', file
-        f     = open(file, 'r')
-        lines = f.readlines()
-        header = lines[0]
-        assert header.strip() == freqFileHeader.strip()
-        first = lines[0].split(' ')
-        lines = lines[1:]
-        for line in lines:
-            row = line.split(' ')
-            timestamp  = TimeAgent.hour(TimeAgent.mjd2dt(float(row[0]))) #mjdt1
-            if not self.data.has_key(timestamp):
-                self.reportLine("ERROR: No wind data for %s\n" % timestamp)
-                continue
-            # frequencies
-            self.data[timestamp]['freqs'] = []
-            # OpacityTime<freq>List_avrg
-            self.data[timestamp]['tauCleo']  = []
-            # TsysTime<freq>List_avrg
-            self.data[timestamp]['tSysCleo'] = []
-            # TatmTime<freq>List_avrg
-            self.data[timestamp]['tAtmCleo'] = []
-            num = self.numAtmoFreqs
-            for i in range(num):
-                #print first[ifreq+1], first[ifreq+51], first[ifreq+101]
-                self.data[timestamp]['freqs'].append(self.atmoFreqs[i])
-                self.data[timestamp]['tauCleo'].append(float(row[i+1]))
-                self.data[timestamp]['tSysCleo'].append(float(row[i+num+1]))
-                self.data[timestamp]['tAtmCleo'].append(float(row[i+(num*2)+1]))
-        f.close()
+        started = self.timings.start("parse atmosphere")
+        f = CleoOutputFile(file, freqFileHeader)
+
+        # OpacityTime<freq>List_avrg, TsysTime<freq>List_avrg and
+        # TatmTime<freq>List_avrg, as (row x freq) tables
+        tau  = f.table(["OpacityTime%dList_avrg" % freq \
+            for freq in self.atmoFreqs])
+        tSys = f.table(["TsysTime%dList_avrg" % freq \
+            for freq in self.atmoFreqs])
+        tAtm = f.table(["TatmTime%dList_avrg" % freq \
+            for freq in self.atmoFreqs])
+
+        missing = self.data.setAtmosphere(f.hours(), tau, tSys, tAtm)
+        self.timings.stop(started, rows = len(f))
+        for timestamp in missing:
+            self.reportLine("ERROR: No wind data for %s\n" % timestamp)
+
+    def connect(self):
+        """
+        Connects to the DB, and sets up the date registries that spare
+        us from looking up each date with its own queries.
+        """
+        cnn = pg.connect(user = "dss", dbname = self.dbname, port = settings.DATABASE_PORT)
+        # count our queries, for the timings
+        self.c = QueryCounter(cnn)
+        self.timings.counter = self.c
+        self.registries = {}
+
+    def registry(self, table):
+        if not self.registries.has_key(table):
+            self.registries[table] = DateRegistry(self.c, table)
+        return self.registries[table]
 
     def addTimeToDB(self, timestamp, table):
         """
@@ -253,21 +351,7 @@ class CleoDBImport:
         table.  If it doesn't exist, create it.
         In any case returns it's ID.
         """
-
-        select_query = "SELECT id FROM %s WHERE date = '%s'" % \
-            (table, timestamp)
-        insert_query = "INSERT INTO %s (date) VALUES ('%s')" % \
-            (table, timestamp)
-
-        # timestamp already exists?
-        r = self.c.query(select_query)
-        if len(r.dictresult()) == 0:
-            # it doesn't, insert it
-            self.c.query(insert_query)
-            # now get the id of what we just created
-            r = self.c.query(select_query) 
-
-        return r.dictresult()[0]["id"]
+        return self.registry(table).get(timestamp)
         
     def addForecastTime(self, timestamp):
         return self.addTimeToDB(timestamp, "forecast_times")
@@ -281,41 +365,38 @@ class CleoDBImport:
         table.  If it doesn't exist, create it.
         In any case returns it's ID.
         """
+        return self.addTimeToDB(timestamp, "weather_dates")
 
-        # look to see if this timestamp already exists
-        r = self.c.query("SELECT id FROM weather_dates WHERE date = '%s'" % timestamp)
-
-        if len(r.dictresult()) == 0:
-            # it doesn't, insert it
-            self.c.query("INSERT INTO weather_dates (date) VALUES ('%s')" % timestamp)
-            # now get the id of what we just created
-            r = \
-                self.c.query("SELECT id FROM weather_dates WHERE date = '%s'" % timestamp)
-
-        return r.dictresult()[0]["id"]
+    def preloadWeatherDates(self):
+        "Reads in the weather dates covered by our data with one query."
+        if len(self.data) > 0:
+            self.registry("weather_dates").preload(self.data.timestamps[0]
+                                                 , self.data.timestamps[-1])
 
     def addForecast(self
                   , forecast_type_id
                   , weather_date_id
                   , forecast_time_id
                   , import_time_id
-                  , value):
+                  , hour):
         """
-        Intelligent insert into the forcast table from the data dictionary
-        by checking forecast type and timestamp.
+        Intelligent insert into the forcast table from the given hour of
+        the batch of forecasts by checking forecast type and timestamp.
         """
-        speed_mph  = value['speed_mph']
-        speed_ms   = value['speed_ms']
-        irradiance = value['irradiance']
-        r = self.c.query("""SELECT wind_speed
+        speed_mph  = self.data.speed_mph[hour]
+        speed_ms   = self.data.speed_ms[hour]
+        irradiance = self.data.irradiance[hour]
+        r = self.c.query("""SELECT id
                             FROM forecasts
                             WHERE forecast_type_id = %s and weather_date_id = %s
                          """ % (forecast_type_id, weather_date_id))
 
         if len(r.dictresult()) == 0:
+            # the insert itself tells us the id of the new forecast
             q = """INSERT
                    INTO forecasts (forecast_type_id, weather_date_id, forecast_time_id, import_time_id, wind_speed, wind_speed_mph, irradiance)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""" % (forecast_type_id
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)
+                   RETURNING id""" % (forecast_type_id
                                            , weather_date_id
                                            , forecast_time_id
                                            , import_time_id
@@ -323,22 +404,20 @@ class CleoDBImport:
                                            , speed_mph
                                            , irradiance
                                              )
-            self.c.query(q)
+            r = self.c.query(q)
 
-        # Get the id of the forecast just inserted
-        r  = self.c.query('SELECT id from forecasts ORDER BY id DESC LIMIT 1')
         return r.dictresult()[0]["id"]
 
-    def addForecastByFrequency(self, id, value):
+    def addForecastByFrequency(self, id, hour):
         """
         Intelligent insert into the forcast_by_frequency table from the
-        data dictionary
+        given hour of the batch of forecasts
         by checking frequency and forecast id.
         """
-        for i, (freq, tau, tAtm) in enumerate(zip(value['freqs']
-                                          , value['tauCleo']
-                                          , value['tAtmCleo']
-                                        )):
+        for freq, tau, tAtm in zip(self.data.freqs
+                                 , self.data.tau[hour]
+                                 , self.data.tatm[hour]
+                                  ):
             r = self.c.query("""SELECT opacity, tsys
                                 FROM forecast_by_frequency
                                 WHERE forecast_id = %s AND frequency = %s
@@ -350,79 +429,302 @@ class CleoDBImport:
                        VALUES(%s, %s, %s, %s)""" % (freq, tau, tAtm, id)
                 self.c.query(q)
 
+    def checkedHours(self):
+        """
+        Validates our batch of forecasts: returns the indices of the
+        hours that should go into the DB, and reports on those that can't.
+        """
+        hours = []
+        for i, timestamp in enumerate(self.data.timestamps):
+            if not self.data.hasAtmo[i]:
+                self.reportLine("ERROR: Got wind but not atmosphere forecasts for %s\n" % timestamp)
+            elif self.data.forecast_type_ids[i] != NO_FORECAST_TYPE:
+                self.reportLine("Inserting weather for %s: %5.2f, %5.2f\n" % \
+                    (timestamp, self.data.speed_mph[i], self.data.irradiance[i]))
+                hours.append(i)
+        return hours
+
     def insert(self):
-        "From data dictionary into database."
+        "From batch of forecasts into database."
+
+        if self.bulk:
+            return self.insertBulk()
 
         self.reportLine("Inserting data for forecast %s\n" % self.forecast_time)
 
         # uncomment this line if you're developing and feeling paranoid
         #assert self.dbname != "weather"          
-        self.c = pg.connect(user = "dss", dbname = self.dbname, port = settings.DATABASE_PORT)
+        self.connect()
+        started = self.timings.start("insert")
 
         # for the data we are inserting, record what forecast_time
         # this is for, and when the import was run.
         forecast_time_id = self.addForecastTime(self.forecast_time)
         import_time_id   = self.addImportTime(self.import_time)
+        self.preloadWeatherDates()
+
+        hours = self.checkedHours()
+        for hour in hours:
+            forecast_type_id = self.data.forecast_type_ids[hour]
+            weather_dates_id = self.addWeatherDate(self.data.timestamps[hour])
+            forecast_id = self.addForecast(forecast_type_id
+                                         , weather_dates_id
+                                         , forecast_time_id
+                                         , import_time_id
+                                         , hour)
+            self.addForecastByFrequency(forecast_id, hour)
+
+        self.timings.stop(started, rows = len(hours))
+        self.insertTimings()
+        self.c.close()
 
-        for timestamp, value in self.data:
-            forecast_type_id = value['forecast_type_id']
-            if value.has_key('tauCleo') and \
-               value.has_key('tSysCleo') and \
-               value.has_key('tAtmCleo'):
-                if forecast_type_id is None:
-                    continue
+    def insertBulk(self):
+        """
+        From batch of forecasts into database, but instead of a couple of
+        queries per forecast and per frequency, all the rows of this
+        import are staged first and then written with one multi-row
+        statement per table.  Everything happens inside a single
+        transaction, so a failed import leaves nothing behind.
+        """
 
-                self.reportLine("Inserting weather for %s: %5.2f, %5.2f\n" % \
-                    (timestamp, value['speed_mph'], value['irradiance']))
-
-                weather_dates_id = self.addWeatherDate(timestamp)
-                forecast_id = self.addForecast(forecast_type_id
-                                             , weather_dates_id
-                                             , forecast_time_id
-                                             , import_time_id
-                                             , value)
-                self.addForecastByFrequency(forecast_id, value)
-            else:
-                self.reportLine("ERROR: Got wind but not atmosphere forecasts for %s\n" % timestamp)
+        self.reportLine("Inserting data for forecast %s\n" % self.forecast_time)
 
+        self.connect()
+        self.c.query("BEGIN")
+        try:
+            self.insertBulkRows()
+            started = self.timings.start("commit")
+            self.c.query("COMMIT")
+            self.timings.stop(started)
+        except Exception:
+            # it's the original error that explains what went wrong, so
+            # don't let a failed ROLLBACK (e.g., on a dead connection)
+            # replace it
+            t, v, tb = sys.exc_info()
+            try:
+                self.c.query("ROLLBACK")
+            except Exception:
+                pass
+            try:
+                self.c.close()
+            except Exception:
+                pass
+            raise t, v, tb
+        self.insertTimings()
         self.c.close()
 
+    def insertTimings(self):
+        "Records our timings in the DB, if we've been asked to."
+        if self.timingsToDB:
+            self.timings.insert(self.c
+                              , self.addForecastTime(self.forecast_time)
+                              , self.addImportTime(self.import_time))
+
+    def insertBulkRows(self):
+        "Stages the batch of forecasts and writes it out table by table."
+
+        started = self.timings.start("insert dates")
+        self.lockDates()
+        forecast_time_id = self.addForecastTime(self.forecast_time)
+        import_time_id   = self.addImportTime(self.import_time)
+
+        # stage what we are going to insert, with the same checks as insert
+        hours = self.checkedHours()
+        if len(hours) == 0:
+            self.timings.stop(started)
+            return
+
+        self.preloadWeatherDates()
+        weather_date_ids = self.registry("weather_dates").getIds( \
+            [self.data.timestamps[hour] for hour in hours])
+        self.timings.stop(started, rows = len(hours))
+
+        # forecasts already in the DB are not written again, but they
+        # may still be missing some of their frequencies
+        keys = [(int(self.data.forecast_type_ids[hour]), wd) \
+            for hour, wd in zip(hours, weather_date_ids)]
+        started = self.timings.start("insert forecasts")
+        forecast_ids = self.getForecastIds(keys)
+        newHours = [(key, hour) for key, hour in zip(keys, hours) \
+            if not forecast_ids.has_key(key)]
+        forecast_ids.update(self.addForecasts(forecast_time_id
+                                            , import_time_id
+                                            , newHours))
+        self.timings.stop(started, rows = len(newHours))
+
+        started = self.timings.start("insert forecast_by_frequency")
+        existing = self.getForecastFrequencies(forecast_ids.values())
+        freqRows = []
+        for key, hour in zip(keys, hours):
+            id = forecast_ids[key]
+            # tsys = tAtm from Cleo
+            for freq, tau, tAtm in zip(self.data.freqs
+                                     , self.data.tau[hour]
+                                     , self.data.tatm[hour]):
+                if (id, freq) not in existing:
+                    freqRows.append((freq, tau, tAtm, id))
+        if len(freqRows) > 0:
+            self.c.query("""INSERT
+                            INTO forecast_by_frequency (frequency, opacity, tsys, forecast_id)
+                            VALUES %s""" % self.valuesList(freqRows))
+        self.timings.stop(started, rows = len(freqRows))
+
+    def lockDates(self):
+        """
+        The date tables have no unique constraints, so imports running
+        side by side (e.g., cleoDBBackfill's workers) would each find the
+        same date missing and create it.  So only one transaction at a
+        time gets to create dates: SHARE ROW EXCLUSIVE conflicts with
+        itself and with inserts, but not with reads.  The lock is held
+        until we COMMIT or ROLLBACK; since our registries are only filled
+        after taking it, they see the dates the others created.
+        """
+        self.c.query("""
+                     LOCK TABLE forecast_times, import_times, weather_dates
+                     IN SHARE ROW EXCLUSIVE MODE
+                     """)
+
+    def valuesList(self, rows):
+        "[(1, 2.0), (3, 4.0)] -> '(1, 2.0), (3, 4.0)' for multi-row inserts."
+        return ", ".join(["(%s)" % ", ".join([str(v) for v in row]) \
+            for row in rows])
+
+    def getForecastIds(self, keys):
+        """
+        Given (forecast_type_id, weather_date_id) pairs, returns the IDs
+        of the ones that already have a forecast, keyed by those pairs.
+        """
+        weather_date_ids = ", ".join([str(wd) for _, wd in keys])
+        r = self.c.query("""SELECT id, forecast_type_id, weather_date_id
+                            FROM forecasts
+                            WHERE weather_date_id IN (%s)
+                         """ % weather_date_ids)
+        wanted = set(keys)
+        ids = {}
+        for row in r.dictresult():
+            key = (row['forecast_type_id'], row['weather_date_id'])
+            if key in wanted:
+                ids[key] = row['id']
+        return ids
+
+    def addForecasts(self, forecast_time_id, import_time_id, rows):
+        """
+        The bulk version of addForecast: inserts a forecast for each of
+        the given ((forecast_type_id, weather_date_id), hour) rows,
+        and returns their new IDs keyed by those pairs.
+        """
+        if len(rows) == 0:
+            return {}
+        values = [(forecast_type_id
+                 , weather_date_id
+                 , forecast_time_id
+                 , import_time_id
+                 , self.data.speed_ms[hour]
+                 , self.data.speed_mph[hour]
+                 , self.data.irradiance[hour])
+            for (forecast_type_id, weather_date_id), hour in rows]
+        r = self.c.query("""INSERT
+                            INTO forecasts (forecast_type_id, weather_date_id, forecast_time_id, import_time_id, wind_speed, wind_speed_mph, irradiance)
+                            VALUES %s
+                            RETURNING id, forecast_type_id, weather_date_id
+                         """ % self.valuesList(values))
+        return dict([((row['forecast_type_id'], row['weather_date_id'])
+                    , row['id']) for row in r.dictresult()])
+
+    def getForecastFrequencies(self, forecast_ids):
+        "Which (forecast_id, frequency) pairs are already in the DB?"
+        if len(forecast_ids) == 0:
+            return set()
+        ids = ", ".join([str(id) for id in forecast_ids])
+        r = self.c.query("""SELECT forecast_id, frequency
+                            FROM forecast_by_frequency
+                            WHERE forecast_id IN (%s)
+                         """ % ids)
+        return set([(row['forecast_id'], row['frequency']) \
+            for row in r.dictresult()])
+
     def findForecastFiles(self):
         """
-        Finds the files that we would like to import, based off the 
-        assumption that they are the most recent ones in our path.
+        Finds the files that we would like to import: each of our two
+        cleo commands was run in its own directory of our scratch
+        directory, and so wrote its results into the only subdirectory
+        there.
         """
 
         # where are the files?  See the cleo help:
         # "The results of this program are a set of files that are 
         # placed in a newly-created subdirectory of the current dir."
-        # but we can override it with the path member
-        print "self.path: ", self.path
-
-        # the last two most recent dirs are the results from our two
-        # commands we fired off in getWeather()
-        f1, f2 = sorted([d for d in listdir(self.path) \
-            if "Forecasts" in d])[-2:]
+        print "self.runDir: ", self.runDir
 
-        # the frequency dependent realted stuff was written first    
-        atmFile =  self.path + "/" + f1 + '/time_avrg' + \
-            f1[9:] + '.txt'
+        # the frequency dependent realted stuff
+        atmFile = self.findForecastFile(self.runDir + "/atmo")
 
-        # then came the 'ground' or wind speed stuff     
-        windFile = self.path + "/" + f2 + '/time_avrg' + f2[9:] + '.txt'
+        # and the 'ground' or wind speed stuff
+        windFile = self.findForecastFile(self.runDir + "/wind")
         
         # Check the FileList* files in each dir for FT's.
         # Story: https://www.pivotaltracker.com/story/show/14224103
 
         return atmFile, windFile
 
+    def useCache(self):
+        "Real time forecasts depend on when cleo runs, so aren't cached."
+        return self.cache is not None and self.history
+
+    def getForecastFiles(self):
+        """
+        Returns the (atmo, wind) files for our forecast time: from the
+        cache if we can, otherwise by calling cleo - what it produced is
+        cached once parse has read it.  Cached files are linked into our
+        scratch directory, so that others sharing the cache can't evict
+        them from under us.
+        """
+        cmdLines = self.getCleoCmdLines()
+        files = {}
+        keys = {}
+        self.toCache = []
+        if self.useCache():
+            if self.runDir is None:
+                self.makeRunDir()
+            for name, cmdLine in cmdLines:
+                keys[name] = self.cache.key(self.forecast_time, cmdLine)
+                files[name] = self.cache.get(keys[name]
+                                           , "%s/%s.txt" % (self.runDir, name))
+                if files[name] is not None:
+                    self.reportLine("Using cached cleo (%s) output: %s\n" % \
+                        (name, files[name]))
+
+        toRun = [(name, cmdLine) for name, cmdLine in cmdLines \
+            if files.get(name) is None]
+        if len(toRun) > 0:
+            self.getWeather(toRun)
+            started = self.timings.start("find files")
+            for name, _ in toRun:
+                files[name] = self.findForecastFile(self.runDir + "/" + name)
+                if self.useCache():
+                    self.toCache.append((keys[name], files[name]))
+            self.timings.stop(started, rows = len(toRun))
+
+        return files["atmo"], files["wind"]
+
+    def findForecastFile(self, dir):
+        "The time_avrg file of the cleo results in dir."
+        f = [d for d in listdir(dir) if "Forecasts" in d][0]
+        return dir + "/" + f + '/time_avrg' + f[9:] + '.txt'
+
     def reportToFile(self, filename = None):
 
-        # make the filename unique by adding the timestamp (import time)
+        # make the filename unique by adding the forecast time and
+        # the timestamp (import time): imports may run side by side
+        forecastStr = datetime.strftime(self.forecast_time, "%Y_%m_%d_%H")
         timeStr = datetime.strftime(self.import_time, "%Y_%m_%d_%H_%M_%S")
         if filename is None:
             filename = "CleoDBImport"
-        filepath = "%s_%s.txt" % (filename, timeStr)
+        filepath = "%s_%s_%s.txt" % (filename, forecastStr, timeStr)
+
+        # and the timings, in a machine-readable form
+        self.timings.write("%s_%s_%s.json" % (filename, forecastStr, timeStr)
+                         , self.forecast_time, self.import_time)
 
         # write all the report lines to a file
         f = open(filepath, 'w')
@@ -437,31 +739,45 @@ class CleoDBImport:
         f.writelines(fileLines)
         f.close()
 
-    def performImport(self):
-        """
-        Higher level function that performs all the steps for importing
-        new forecast values into the DB:
-            * call CLEO forecast commands to produce forecast files
-            * reads in and parses these files into a data dict
-            * inserts data dict contents into DB
-        """
-
+    def runCleo(self):
+        "Calls cleo (or finds its output in our cache)."
         self.reportLine("Performing import at %s UTC" % datetime.utcnow())
 
-        # call cleo, and find the resulting files
-        self.getWeather()
-        atmFile, windFile = self.findForecastFiles()
+        atmFile, windFile = self.getForecastFiles()
 
         self.files["atmFile"] = atmFile
         self.files["windFile"] = windFile
         self.reportLine("Reading File atmFile: %s \n" % atmFile)
         self.reportLine("Reading File windFile: %s \n" % windFile)        
 
-        # parse the files
-        self.read(atmFile, windFile)
+    def parse(self):
+        """
+        Reads the files cleo gave us into a batch of forecasts, then
+        caches them: only output we could read is worth reusing.
+        """
+        self.read(self.files["atmFile"], self.files["windFile"])
+        for key, file in self.toCache:
+            self.cache.put(key, file)
+        self.toCache = []
+
+    def performImport(self):
+        """
+        Higher level function that performs all the steps for importing
+        new forecast values into the DB:
+            * call CLEO forecast commands to produce forecast files
+              (or find them in our cache)
+            * reads in and parses these files into a batch of forecasts
+            * inserts the batch into DB
+        See ImportPipeline for running these steps for several imports
+        at once.
+        """
 
-        # insert the parsed data into the DB
-        self.insert()
+        try:
+            self.runCleo()
+            self.parse()
+            self.insert()
+        finally:
+            self.cleanUpRunDir()
 
         self.reportToFile()
 
@@ -0,0 +1,122 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from datetime import datetime
+import hashlib
+import os
+import shutil
+import tempfile
+
+# how big (bytes) we let the cache grow before evicting the oldest files
+CACHESIZE = 2 * 1024 * 1024 * 1024
+
+class CleoOutputCache:
+
+    """
+    An on-disk cache of CLEO time_avrg output files.  A file is stored
+    under the SHA-1 of the forecast time and the command line that
+    produced it; since the command line names the sites, frequencies
+    and measurements, any change to those makes a new key.
+    Only historical (-mimicHistorical) output should be cached: a real
+    time forecast depends on when CLEO gets run.
+    When the cache grows past its size limit, the least recently used
+    files (by mtime, which a hit refreshes) are removed.
+    The cache may be shared by imports running side by side: files are
+    written to a temporary name and then renamed into place.
+    """
+
+    def __init__(self, dir, maxBytes = CACHESIZE):
+        self.dir = dir
+        self.maxBytes = maxBytes
+        if not os.path.isdir(dir):
+            os.makedirs(dir)
+
+    def key(self, forecast_time, cmdLine):
+        ft = datetime.strftime(forecast_time, "%Y-%m-%d %H:%M:%S")
+        return hashlib.sha1("%s\n%s" % (ft, cmdLine)).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.dir, key + ".txt")
+
+    def get(self, key, dest = None):
+        """
+        The path of the cached file for key, or None if there isn't one.
+        Others sharing the cache may evict the file at any time, so
+        given dest, the file is hard linked (or, failing that, copied)
+        there, where it's safe from them, and dest is returned instead.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path, None)
+            if dest is not None:
+                try:
+                    os.link(path, dest)
+                except OSError:
+                    # e.g., on another file system
+                    shutil.copyfile(path, dest)
+                path = dest
+        except (IOError, OSError):
+            # not there, or evicted just now
+            return None
+        return path
+
+    def put(self, key, src):
+        "Copies the file src into the cache, and returns the cached path."
+        fd, tmp = tempfile.mkstemp(prefix = ".tmp_", dir = self.dir)
+        os.close(fd)
+        shutil.copyfile(src, tmp)
+        path = self.path(key)
+        os.rename(tmp, path)
+        self.evict()
+        return path
+
+    def files(self):
+        "(mtime, size, path) of each cached file."
+        files = []
+        for f in os.listdir(self.dir):
+            if not f.endswith(".txt"):
+                continue
+            path = os.path.join(self.dir, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                # evicted by someone else
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def size(self):
+        return sum([size for _, size, _ in self.files()])
+
+    def evict(self):
+        "Removes the least recently used files until we fit in maxBytes."
+        files = self.files()
+        total = sum([size for _, size, _ in files])
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
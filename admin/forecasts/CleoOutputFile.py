@@ -0,0 +1,80 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from datetime import datetime, timedelta
+import numpy
+
+# MJD 0
+MJD_EPOCH = datetime(1858, 11, 17)
+
+class CleoOutputFile:
+
+    """
+    A CLEO time_avrg output file, read column-wise into NumPy arrays.
+    The first line is a header of column names; every other line is a
+    row of numbers, the first of which is the MJD of that row.
+    The whole body of the file is converted in one go, and columns are
+    looked up by name from the header just once.
+    """
+
+    def __init__(self, path, header = None):
+        self.path = path
+
+        f = open(path, 'r')
+        self.header = f.readline().split()
+        body = f.read()
+        f.close()
+
+        if header is not None:
+            assert self.header == header.split()
+
+        self.columns = dict([(name, i) \
+            for i, name in enumerate(self.header)])
+
+        numCols = len(self.header)
+        values = numpy.fromstring(body, sep = ' ')
+        if values.size % numCols != 0:
+            raise ValueError("%s: %d values don't fit in %d columns" % \
+                (path, values.size, numCols))
+        self.values = values.reshape((-1, numCols))
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def column(self, name):
+        "All the values of the named column."
+        return self.values[:, self.columns[name]]
+
+    def table(self, names):
+        "The named columns as a 2-D (row x name) array."
+        return self.values[:, [self.columns[name] for name in names]]
+
+    def mjds(self):
+        return self.values[:, 0]
+
+    def hours(self):
+        """
+        The MJD column as datetimes rounded to the nearest hour, as
+        in TimeAgent.hour(TimeAgent.mjd2dt(mjd)).
+        """
+        hours = numpy.floor(self.mjds() * 24.0 + 0.5).astype(int)
+        return [MJD_EPOCH + timedelta(hours = int(h)) for h in hours]
@@ -21,8 +21,11 @@
 #       Green Bank, WV 24944-0002 USA
 
 from datetime import datetime
-import time
+from bisect   import bisect_left
+import calendar
+import json
 import os
+import time
 import zipfile
 
 def flatten(x):
@@ -36,30 +39,131 @@ def flatten(x):
 
 class CleoStartTimes:
 
-    def __init__(self, dir = "/users/rmaddale/Weather/ArchiveNAM"):
+    """
+    The start times of the NAM forecasts archived for cleo, from the
+    names of the nam_c27_<timestamp>.buf files in the archive directory,
+    either on their own or inside of zip files there.
+    Reading every zip is slow, so what we find is kept in a catalog
+    (a JSON file) that is refreshed incrementally: the directory is only
+    listed again if its mtime changed, and a zip is only opened again
+    if its mtime or size changed.  The start times are kept as a sorted
+    list of unique timestamps, so ranges of them are found by bisection.
+    """
+
+    def __init__(self, dir = "/users/rmaddale/Weather/ArchiveNAM"
+               , catalog = "~/.cleoStartTimes.json"):
         self.directory = dir
+        # None for no persistent catalog
+        self.catalogPath = os.path.expanduser(catalog) \
+            if catalog is not None else None
+        self.catalog = None
+        self.times = []
 
     def get(self):
-        files = self.get_filenames()
-        tss = map(self.get_ct, files)
-        tss.sort()
-        utss = self.f2(tss)
-        return map(self.ts2dt, utss)
+        "All the start times, in order."
+        self.refresh()
+        return map(self.ts2dt, self.times)
+
+    def getRange(self, start, end):
+        "The start times from start up to (but not including) end."
+        self.refresh()
+        lo = bisect_left(self.times, self.utc2ts(start))
+        hi = bisect_left(self.times, self.utc2ts(end))
+        return map(self.ts2dt, self.times[lo:hi])
+
+    def contains(self, dt):
+        self.refresh()
+        ts = self.utc2ts(dt)
+        i = bisect_left(self.times, ts)
+        return i < len(self.times) and self.times[i] == ts
 
     def get_filenames(self):
-        filenames = [f for f in os.listdir(self.directory) if self.match(f, ".buf")]
-        zipnames  = [f for f in os.listdir(self.directory) if self.match(f, ".zip")]
-        zipfilenames = []
-        for z in zipnames:
-            zf = zipfile.ZipFile(self.directory + "/" + z, "r")
-            zipfilenames.append([zi.filename for zi in zf.infolist()])
-        flattened = flatten(zipfilenames)
-        return flatten(zipfilenames) + filenames
+        "The names of all the .buf files, whether zipped or not."
+        self.refresh()
+        return flatten([entry["names"] \
+            for entry in self.catalog["files"].values()])
+
+    def newCatalog(self):
+        return {"directory" : self.directory
+              , "dirMtime"  : None
+              , "files"     : {}
+               }
+
+    def loadCatalog(self):
+        if self.catalogPath is not None and os.path.exists(self.catalogPath):
+            f = open(self.catalogPath, 'r')
+            catalog = json.load(f)
+            f.close()
+            if catalog.get("directory") == self.directory:
+                return catalog
+        return self.newCatalog()
+
+    def saveCatalog(self):
+        if self.catalogPath is None:
+            return
+        tmp = self.catalogPath + ".tmp"
+        f = open(tmp, 'w')
+        json.dump(self.catalog, f)
+        f.close()
+        os.rename(tmp, self.catalogPath)
+
+    def refresh(self):
+        """
+        Brings the catalog up to date with the archive directory, reading
+        only what has changed since we last looked.
+        """
+        if self.catalog is None:
+            self.catalog = self.loadCatalog()
+            self.times = None
+        files = self.catalog["files"]
+        changed = False
+
+        dirMtime = os.stat(self.directory).st_mtime
+        if dirMtime != self.catalog["dirMtime"]:
+            names = [f for f in os.listdir(self.directory) \
+                if self.match(f, ".buf") or self.match(f, ".zip")]
+            for name in set(files.keys()).difference(names):
+                del files[name]
+            for name in names:
+                if not files.has_key(name):
+                    files[name] = {"mtime" : None, "size" : None
+                                 , "names" : [name]}
+            self.catalog["dirMtime"] = dirMtime
+            changed = True
+
+        # zips can be added to without the directory noticing
+        for name, entry in files.items():
+            if not self.match(name, ".zip"):
+                continue
+            path = self.directory + "/" + name
+            try:
+                st = os.stat(path)
+            except OSError:
+                del files[name]
+                changed = True
+                continue
+            if (st.st_mtime, st.st_size) != (entry["mtime"], entry["size"]):
+                zf = zipfile.ZipFile(path, "r")
+                entry["names"] = [zi.filename for zi in zf.infolist() \
+                    if self.match(zi.filename, ".buf")]
+                zf.close()
+                entry["mtime"], entry["size"] = st.st_mtime, st.st_size
+                changed = True
+
+        if changed or self.times is None:
+            self.times = sorted(set([self.get_ct(name) \
+                for entry in files.values() for name in entry["names"]]))
+        if changed:
+            self.saveCatalog()
 
     def dt2ts(self, dt):
         # datetime to seconds (timestamp)
         return time.mktime(dt.timetuple())
 
+    def utc2ts(self, dt):
+        # UTC datetime to seconds (timestamp), the inverse of ts2dt
+        return calendar.timegm(dt.timetuple())
+
     def ts2dt(self, ts):
         # seconds (timestamp) to datetime
         return datetime.utcfromtimestamp(ts)
@@ -71,12 +175,3 @@ class CleoStartTimes:
     def get_ct(self, fn):
         # "nam_c27_1275566400.buf" to 1275566400
         return int(fn[8:-4])
-
-    def f2(self, seq): 
-        # http://www.peterbe.com/plog/uniqifiers-benchmark
-        # order preserving
-        checked = []
-        for e in seq:
-            if e not in checked:
-                checked.append(e)
-        return checked
@@ -60,6 +60,19 @@ class DBImport:
         else:
             return windSpeedForcast
 
+    def correctWindSpeeds(self, dts, windSpeedForcasts):
+        """
+        Vectorized correctWindSpeed: corrects the forcasted wind speeds
+        at the given datetimes all at once, returning them as an array.
+        """
+        speeds = numpy.asarray(windSpeedForcasts, dtype = float)
+        day = self.solar.isDayTimes(dts)
+        corrected = numpy.where(day
+                              , numpy.polyval(self.windDayCoeff, speeds)
+                              , numpy.polyval(self.windNightCoeff, speeds))
+        corrected = numpy.maximum(corrected, 0.0)
+        return numpy.where(speeds < 11.1, corrected, speeds)
+
     #def plotCorrection(self):
     #    xs = numpy.arange(0.0, 15.0, 0.1)
     #    plt.plot(xs, numpy.polyval(self.windDayCoeff, xs))
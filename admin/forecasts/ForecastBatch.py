@@ -0,0 +1,99 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+import numpy
+
+# forecast type for hours that are outside of the forecast
+NO_FORECAST_TYPE = 0
+
+class ForecastBatch:
+
+    """
+    All the forecasts from one CLEO import, stored column-wise:
+       * timestamps        - the hour of each forecast, in order
+       * forecast_type_ids - (hour) ints, NO_FORECAST_TYPE if none
+       * speed_mph         - (hour) raw CLEO wind speeds
+       * speed_ms          - (hour) corrected wind speeds
+       * irradiance        - (hour) floats
+       * freqs             - (freq) the frequencies of the columns below
+       * tau, tsys, tatm   - (hour x freq) floats
+       * hasAtmo           - (hour) did we get atmosphere for this hour?
+    Hours are first created from the wind (ground) file; the atmosphere
+    is then matched up to those hours.
+    """
+
+    def __init__(self, timestamps, forecast_type_ids, freqs):
+
+        # keep everything in time order
+        order = sorted(range(len(timestamps)), key = lambda i: timestamps[i])
+        self.timestamps = [timestamps[i] for i in order]
+        self.forecast_type_ids = numpy.array( \
+            [self.typeId(forecast_type_ids[i]) for i in order], dtype = int)
+        self.index = dict([(t, i) for i, t in enumerate(self.timestamps)])
+
+        numHours = len(self.timestamps)
+        self.freqs = numpy.array(freqs, dtype = int)
+        numFreqs = len(self.freqs)
+
+        self.speed_mph  = numpy.zeros(numHours)
+        self.speed_ms   = numpy.zeros(numHours)
+        self.irradiance = numpy.zeros(numHours)
+
+        self.tau  = numpy.empty((numHours, numFreqs))
+        self.tsys = numpy.empty((numHours, numFreqs))
+        self.tatm = numpy.empty((numHours, numFreqs))
+        self.tau.fill(numpy.nan)
+        self.tsys.fill(numpy.nan)
+        self.tatm.fill(numpy.nan)
+        self.hasAtmo = numpy.zeros(numHours, dtype = bool)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def typeId(self, forecast_type_id):
+        return NO_FORECAST_TYPE if forecast_type_id is None \
+                                else forecast_type_id
+
+    def setAtmosphere(self, timestamps, tau, tsys, tatm):
+        """
+        Matches up the given (hour x freq) atmosphere tables with our
+        hours, and returns those timestamps we have no hour for.
+        """
+        rows = []
+        hours = []
+        missing = []
+        for row, timestamp in enumerate(timestamps):
+            i = self.index.get(timestamp)
+            if i is None:
+                missing.append(timestamp)
+            else:
+                rows.append(row)
+                hours.append(i)
+        self.tau[hours]  = numpy.asarray(tau)[rows]
+        self.tsys[hours] = numpy.asarray(tsys)[rows]
+        self.tatm[hours] = numpy.asarray(tatm)[rows]
+        self.hasAtmo[hours] = True
+        return missing
+
+    def hasForecastType(self):
+        "(hour) mask of which hours are within the forecast."
+        return self.forecast_type_ids != NO_FORECAST_TYPE
@@ -0,0 +1,136 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from Queue import Queue
+import threading
+import traceback
+
+# marks the end of the work on a queue
+STOP = None
+
+class ImportPipeline:
+
+    """
+    Runs several CleoDBImports with their steps overlapped, as in an
+    assembly line:
+
+        cleo (several threads) -> parse -> insert & report
+
+    with a bounded queue between each stage.  So while cleo is busy
+    with one forecast time, the previous one can be parsed and the one
+    before that written to the DB, and catching up after an outage is
+    only as slow as cleo.  The bounded queues keep cleo from getting
+    too far ahead: only so many finished runs (scratch directories and
+    parsed batches) are ever waiting for the later stages.
+    Cleo runs as subprocesses and the DB does its own work, so threads
+    are enough to overlap them.
+    An import that fails at any stage skips the rest of them, and has
+    its scratch directory cleaned up.
+    """
+
+    def __init__(self, imports, cleoThreads = 2, queueSize = 2
+               , onDone = None):
+        self.imports     = imports
+        self.cleoThreads = cleoThreads
+        self.queueSize   = queueSize
+        # called with (import, traceback or None) as each one finishes
+        self.onDone      = onDone
+        self.results     = []
+
+    def runCleo(self, cleo):
+        cleo.runCleo()
+
+    def parse(self, cleo):
+        cleo.parse()
+
+    def insert(self, cleo):
+        try:
+            cleo.insert()
+        finally:
+            cleo.cleanUpRunDir()
+        cleo.reportToFile()
+
+    def stage(self, work, inQ, outQ):
+        "Does the given work on each import from inQ, passing it on."
+        while True:
+            item = inQ.get()
+            if item is STOP:
+                return
+            cleo, error = item
+            if error is None:
+                try:
+                    work(cleo)
+                except:
+                    error = traceback.format_exc()
+                    cleo.cleanUpRunDir()
+            outQ.put((cleo, error))
+
+    def finish(self, inQ):
+        "Collects the results from the last stage."
+        while True:
+            item = inQ.get()
+            if item is STOP:
+                return
+            self.results.append(item)
+            if self.onDone is not None:
+                self.onDone(*item)
+
+    def start(self, target, *args):
+        t = threading.Thread(target = target, args = args)
+        t.daemon = True
+        t.start()
+        return t
+
+    def run(self):
+        """
+        Performs all the imports, and returns (import, traceback or None)
+        for each one, in the order that they finished.
+        """
+        self.results = []
+
+        cleoQ   = Queue()
+        parseQ  = Queue(self.queueSize)
+        insertQ = Queue(self.queueSize)
+        doneQ   = Queue()
+
+        for cleo in self.imports:
+            cleoQ.put((cleo, None))
+        for i in range(self.cleoThreads):
+            cleoQ.put(STOP)
+
+        cleos  = [self.start(self.stage, self.runCleo, cleoQ, parseQ) \
+            for i in range(self.cleoThreads)]
+        parser = self.start(self.stage, self.parse, parseQ, insertQ)
+        writer = self.start(self.stage, self.insert, insertQ, doneQ)
+        finisher = self.start(self.finish, doneQ)
+
+        # shut the stages down in order, as each runs out of work
+        for t in cleos:
+            t.join()
+        parseQ.put(STOP)
+        parser.join()
+        insertQ.put(STOP)
+        writer.join()
+        doneQ.put(STOP)
+        finisher.join()
+
+        return self.results
@@ -0,0 +1,104 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+import json
+import time
+
+class QueryCounter:
+
+    """
+    Stands in for a pg connection, counting the queries made through it.
+    Anything other than query() goes straight to the real connection.
+    """
+
+    def __init__(self, cnn):
+        self.cnn = cnn
+        self.count = 0
+
+    def query(self, q):
+        self.count += 1
+        return self.cnn.query(q)
+
+    def __getattr__(self, name):
+        return getattr(self.cnn, name)
+
+class ImportTimings:
+
+    """
+    How long each phase of an import took, along with how many rows it
+    dealt with and how many queries it made, if that makes sense for it.
+    A phase is timed with:
+        started = timings.start("parse wind")
+        ...
+        timings.stop(started, rows = n)
+    The results can be written to a JSON file, or to the import_timings
+    table (see db_schema/updateImportTimings.sql).
+    """
+
+    def __init__(self):
+        self.phases = []
+        # a QueryCounter, once there's a DB connection
+        self.counter = None
+
+    def queries(self):
+        return self.counter.count if self.counter is not None else 0
+
+    def start(self, phase):
+        return (phase, time.time(), self.queries())
+
+    def stop(self, started, rows = None):
+        phase, start, queries = started
+        self.add(phase, time.time() - start, rows
+               , self.queries() - queries if self.counter is not None \
+                                           else None)
+
+    def add(self, phase, seconds, rows = None, queries = None):
+        self.phases.append({"phase"   : phase
+                          , "seconds" : seconds
+                          , "rows"    : rows
+                          , "queries" : queries
+                           })
+
+    def total(self):
+        return sum([p["seconds"] for p in self.phases])
+
+    def write(self, path, forecast_time, import_time):
+        f = open(path, 'w')
+        json.dump({"forecast_time" : str(forecast_time)
+                 , "import_time"   : str(import_time)
+                 , "total_seconds" : self.total()
+                 , "queries"       : self.queries()
+                 , "phases"        : self.phases
+                  }, f, indent = 1)
+        f.close()
+
+    def insert(self, cnn, forecast_time_id, import_time_id):
+        "Writes the phases to the import_timings table, all at once."
+        if len(self.phases) == 0:
+            return
+        null = lambda v: "NULL" if v is None else str(v)
+        values = ", ".join(["(%d, %d, '%s', %f, %s, %s)" % \
+            (import_time_id, forecast_time_id, p["phase"], p["seconds"]
+           , null(p["rows"]), null(p["queries"])) for p in self.phases])
+        cnn.query("""INSERT
+                     INTO import_timings (import_time_id, forecast_time_id, phase, seconds, rows, queries)
+                     VALUES %s""" % values)
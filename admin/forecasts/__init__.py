@@ -1,3 +1,10 @@
 from DBImport import DBImport
 from CleoDBImport import CleoDBImport
+from CleoOutputFile import CleoOutputFile
+from ForecastBatch import ForecastBatch
 from CleoStartTimes import CleoStartTimes
+from BackfillManifest import BackfillManifest
+from CleoOutputCache import CleoOutputCache
+from ImportPipeline import ImportPipeline
+from ImportTimings import ImportTimings, QueryCounter
+from BackfillPlanner import BackfillPlanner
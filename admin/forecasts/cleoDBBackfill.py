@@ -20,27 +20,125 @@
 #       P. O. Box 2
 #       Green Bank, WV 24944-0002 USA
 
-import sys, traceback
-from datetime      import datetime, timedelta
-from CleoDBImport  import CleoDBImport
+import os, sys, traceback
+from datetime         import datetime, timedelta
+from multiprocessing  import Pool
+from CleoDBImport     import CleoDBImport
+from BackfillManifest import BackfillManifest
+from CleoOutputCache  import CleoOutputCache
+from CleoStartTimes   import CleoStartTimes
+from BackfillPlanner  import BackfillPlanner
 
-if len(sys.argv) != 5:
-    print "Usage: python cleoDBBackfill.py <database> <start date (yyyy-mm-dd)> <start hour> <duration days>"
-    exit(1)
+# where cleo's archived NAM input lives
+ARCHIVENAM = "/users/rmaddale/Weather/ArchiveNAM"
 
-database = sys.argv[1]
-start = datetime.strptime(sys.argv[2], "%Y-%m-%d") + timedelta(hours = int(sys.argv[3]))
-end = start + timedelta(days = int(sys.argv[4]))
-print start, end
+def importForecastTime(args):
+    """
+    Imports the given forecast time; meant to be run in a worker process.
+    Each import gets its own cleo scratch directory and DB connection.
+    Returns the forecast time, and the traceback if the import failed.
+    """
+    forecast_time, database, cacheDir = args
+    try:
+        cleo = CleoDBImport(forecast_time, database, ".", True, bulk = True)
+        cleo.quiet = True
+        if cacheDir is not None:
+            cleo.cache = CleoOutputCache(cacheDir)
+        cleo.performImport()
+        return (forecast_time, None)
+    except Exception:
+        return (forecast_time, traceback.format_exc())
 
-delta = timedelta(hours = 6)
+def getForecastTimes(start, end):
+    "All the six-hourly forecast times from start up to end."
+    delta = timedelta(hours = 6)
+    forecast_times = []
+    while start < end:
+        forecast_times.append(start)
+        start += delta
+    return forecast_times
 
-while start < end:
-    print "    ", start
-    try:
-        CleoDBImport(start, database, ".", True).performImport()
-    except:
-        t, v, tb = sys.exc_info()
-        traceback.print_exception(t, v, tb)
-        print "Continuing on to next forecast time ..."
-    start += delta
+def backfill(database, forecast_times, processes = 1, manifest = None
+           , cacheDir = None, importer = importForecastTime):
+    """
+    Imports the given forecast times using a pool of worker processes,
+    reporting progress as they finish.  Returns the failures, as
+    (forecast time, traceback) pairs.
+    If given a BackfillManifest, each result is recorded in it as soon
+    as it comes in.  If given a cache directory, cleo output is shared
+    through a CleoOutputCache there.
+    The workers run importer (see importForecastTime) for each time;
+    since they create dates in the DB side by side, CleoDBImport's bulk
+    insert locks the date tables while it does so.
+    """
+    pool = Pool(processes)
+    jobs = [(ft, database, cacheDir) for ft in forecast_times]
+    failures = []
+    for i, (ft, error) in \
+        enumerate(pool.imap_unordered(importer, jobs)):
+        status = "OK" if error is None else "FAILED"
+        print "    %d of %d: %s %s" % (i + 1, len(jobs), ft, status)
+        if error is not None:
+            failures.append((ft, error))
+        if manifest is not None:
+            if error is None:
+                manifest.setCompleted([ft])
+            else:
+                manifest.setFailed(ft, error)
+    pool.close()
+    pool.join()
+
+    failures.sort()
+    print "Imported %d of %d forecast times." % \
+        (len(jobs) - len(failures), len(jobs))
+    for ft, error in failures:
+        print "Failed to import %s:" % ft
+        print error
+    return failures
+
+def resume(database, start, end, processes = 1, manifestPath = None
+         , cacheDir = None, archiveDir = ARCHIVENAM):
+    """
+    Backfills the forecast times from start up to end, keeping track of
+    them in a manifest file so that the backfill can be interrupted and
+    picked up again: forecast times the manifest has as completed, or
+    that the DB already has forecasts for, are skipped.
+    With the NAM archive at hand, only the forecast times it has input
+    for are attempted; otherwise we try every six hours.
+    """
+    if manifestPath is None:
+        manifestPath = "cleoDBBackfill_%s.json" % database
+    manifest = BackfillManifest(manifestPath)
+
+    planner = BackfillPlanner(database, CleoStartTimes(archiveDir))
+    imported = planner.getImported(start, end)
+    manifest.setCompleted(imported)
+    if os.path.isdir(archiveDir):
+        forecast_times = planner.plan(start, end, imported)
+    else:
+        print "No NAM archive at %s: trying every six hours" % archiveDir
+        forecast_times = getForecastTimes(start, end)
+    manifest.add(forecast_times)
+
+    todo = manifest.getTodo(forecast_times)
+    print "%d forecast times left to import (manifest: %s)" % \
+        (len(todo), manifestPath)
+    return backfill(database, todo, processes, manifest, cacheDir)
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (5, 6, 7, 8, 9):
+        print "Usage: python cleoDBBackfill.py <database> <start date (yyyy-mm-dd)> <start hour> <duration days> [<processes> [<manifest> [<cleo cache dir> [<NAM archive dir>]]]]"
+        exit(1)
+
+    database = sys.argv[1]
+    start = datetime.strptime(sys.argv[2], "%Y-%m-%d") + timedelta(hours = int(sys.argv[3]))
+    end = start + timedelta(days = int(sys.argv[4]))
+    processes = int(sys.argv[5]) if len(sys.argv) >= 6 else 1
+    manifestPath = sys.argv[6] if len(sys.argv) >= 7 else None
+    cacheDir = sys.argv[7] if len(sys.argv) >= 8 else None
+    archiveDir = sys.argv[8] if len(sys.argv) == 9 else ARCHIVENAM
+    print start, end
+
+    failures = resume(database, start, end, processes, manifestPath
+                    , cacheDir, archiveDir)
+    exit(1 if failures else 0)
@@ -20,10 +20,22 @@
 #       P. O. Box 2
 #       Green Bank, WV 24944-0002 USA
 
-from CleoDBImport  import CleoDBImport
+from CleoDBImport     import CleoDBImport
+from BackfillManifest import BackfillManifest
+from ImportPipeline   import ImportPipeline
+from optparse         import OptionParser
 import os
+import sys
 import time
-from datetime import datetime
+import traceback
+from datetime import datetime, timedelta
+
+# pyinotify lets us hear about a new forecast as soon as it lands;
+# without it, we just poll the file
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
 
 RONPATH = "/users/rmaddale/Weather/"
 #RONPATH = "./"                           # for development
@@ -33,14 +45,74 @@ RONFILE = "TS_c27_NAM"
 WEATHERDATABASE = "weather"
 #WEATHERDATABASE = "weather_unit_tests"   # for development
 
-def process(filePath):
-    "Let CleoDBImport do the thing that it does."
+# how often (seconds) we check the file when we aren't told it changed
+POLLINTERVAL = 30*60
+# how long (seconds) the file has to stay unchanged before we read it
+DEBOUNCE = 10
+# where we keep track of the forecast times we've imported
+MANIFEST = "daemonCleoDBImport.json"
+# how far back (days) we go to import forecast times we missed
+CATCHUPDAYS = 7
+
+def process(filePath, database = WEATHERDATABASE, manifest = None
+          , catchUpDays = CATCHUPDAYS):
+    """
+    Let CleoDBImport do the thing that it does, unless the manifest
+    says it's already done it for this forecast time.  Any forecast
+    times we missed (e.g., we were down) are caught up on too, with
+    the steps of the imports overlapped by an ImportPipeline.
+    """
 
     # get the forecast time from the contents of the filePath
     ft = parseForecastTime(open(filePath, 'r').readline())
+    if manifest is not None and manifest.isCompleted(ft):
+        print "Forecast time %s has already been imported" % ft
+        return
+
+    # use this forecast time with the import class; the latest forecast
+    # goes first, then the ones we missed from the cleo archives
+    imports = [CleoDBImport(ft, database, bulk = True)]
+    for missed in getMissedForecastTimes(ft, manifest, catchUpDays):
+        print "Catching up on forecast time %s" % missed
+        imports.append(CleoDBImport(missed, database, history = True
+                                  , bulk = True))
+
+    def done(cleo, error):
+        if manifest is not None:
+            if error is None:
+                manifest.setCompleted([cleo.forecast_time])
+            else:
+                manifest.setFailed(cleo.forecast_time, error)
+        if error is not None:
+            print "Failed to import %s:" % cleo.forecast_time
+            print error
 
-    # use this forecast time with the import class
-    cleo = CleoDBImport(ft, WEATHERDATABASE).performImport()
+    results = ImportPipeline(imports, onDone = done).run()
+    for cleo, error in results:
+        if cleo.forecast_time == ft and error is not None:
+            raise Exception("Failed to import %s" % ft)
+
+def getMissedForecastTimes(ft, manifest, catchUpDays = CATCHUPDAYS):
+    """
+    The six-hourly forecast times before the given one that the
+    manifest doesn't have as imported.  We only look back so far, and
+    never before the manifest's first import, since we can't tell what
+    happened before we kept it.
+    """
+    if manifest is None:
+        return []
+    completed = manifest.getCompleted()
+    if len(completed) == 0:
+        return []
+    missed = []
+    start = max(completed[0], ft - timedelta(days = catchUpDays))
+    t = ft - timedelta(hours = 6)
+    while t >= start:
+        if not manifest.isCompleted(t):
+            missed.append(t)
+        t -= timedelta(hours = 6)
+    missed.reverse()
+    return missed
 
 def parseForecastTime(line):
     """
@@ -50,19 +122,134 @@ def parseForecastTime(line):
     return datetime.strptime(line.split(' ', 1)[1].rstrip('\n'),
                              "%H:%M:%S %d%b%y")
 
-filePath = RONPATH + RONFILE
-previous_change = 0
+class ForecastFileWatcher:
+
+    """
+    Waits for the NAM forecast file to change.  With pyinotify, we're
+    woken up by any write to, or replacement of, the file; otherwise
+    (or if nothing happens for a poll interval) we stat it.  Either way,
+    once it has changed we wait for it to stay unchanged for the
+    debounce time, so that we don't read it while it is being written.
+    """
+
+    def __init__(self, filePath, pollInterval = POLLINTERVAL
+               , debounce = DEBOUNCE, useInotify = True):
+        self.filePath = filePath
+        self.pollInterval = pollInterval
+        self.debounce = debounce
+        self.notifier = None
+        if useInotify and pyinotify is not None:
+            self.initNotifier()
+
+    def initNotifier(self):
+        # watch the directory: the file may be replaced, not rewritten
+        dir, name = os.path.split(os.path.abspath(self.filePath))
+        wm = pyinotify.WatchManager()
+        mask = pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO \
+             | pyinotify.IN_CREATE | pyinotify.IN_MODIFY
+        wm.add_watch(dir, mask)
+        self.notifier = pyinotify.Notifier(wm
+                                         , default_proc_fun = self.onEvent
+                                         , timeout = self.pollInterval * 1000)
+        self.name = name
+        self.changed = False
+
+    def onEvent(self, event):
+        if event.name == self.name:
+            self.changed = True
+
+    def mtime(self):
+        try:
+            return os.stat(self.filePath).st_mtime
+        except OSError:
+            # e.g., in the middle of being replaced
+            return None
+
+    def sleep(self):
+        "Until something happens to our file, or a poll interval passes."
+        if self.notifier is None:
+            time.sleep(self.pollInterval)
+            return
+        self.changed = False
+        deadline = time.time() + self.pollInterval
+        while not self.changed and time.time() < deadline:
+            # times out after a poll interval
+            if not self.notifier.check_events():
+                break
+            self.notifier.read_events()
+            self.notifier.process_events()
+
+    def settle(self, mtime):
+        "Waits for the file to stop changing, and returns its mtime."
+        while True:
+            time.sleep(self.debounce)
+            latest = self.mtime()
+            if latest == mtime and latest is not None:
+                return mtime
+            mtime = latest
+
+    def wait(self, previous_change):
+        """
+        Returns the mtime of the file once it differs from the given one
+        and has settled down; returns straight away if it already does.
+        """
+        mtime = self.mtime()
+        while mtime is None or mtime == previous_change:
+            self.sleep()
+            mtime = self.mtime()
+        return self.settle(mtime)
+
+def run(watcher, database = WEATHERDATABASE, manifest = None
+      , catchUpDays = CATCHUPDAYS, attempts = None):
+    """
+    Imports the forecast in the watcher's file each time it changes,
+    forever (or for the given number of attempts).  When an import
+    fails, it's tried again after a poll interval.
+    """
+    previous_change = 0
+    while attempts is None or attempts > 0:
+        change = watcher.wait(previous_change)
+        if attempts is not None:
+            attempts -= 1
+        try:
+            process(watcher.filePath, database, manifest, catchUpDays)
+            # reset so we can wait for the next change
+            previous_change = change
+        except Exception:
+            # e.g., cleo failed or hung; try again at the next poll
+            t, v, tb = sys.exc_info()
+            traceback.print_exception(t, v, tb)
+            watcher.sleep()
 
-print "Checking %s for inserting weather into %s" % (filePath, WEATHERDATABASE)
+def main():
+    parser = OptionParser(usage = "usage: %prog [options]")
+    parser.add_option("-d", "--database", default = WEATHERDATABASE
+                    , help = "weather database to import into [%default]")
+    parser.add_option("-f", "--file", default = RONPATH + RONFILE
+                    , help = "NAM forecast file to watch [%default]")
+    parser.add_option("-p", "--poll", type = "int", default = POLLINTERVAL
+                    , help = "seconds between checks of the file [%default]")
+    parser.add_option("-b", "--debounce", type = "int", default = DEBOUNCE
+                    , help = "seconds the file must be unchanged before it is read [%default]")
+    parser.add_option("-m", "--manifest", default = MANIFEST
+                    , help = "record of the imported forecast times [%default]")
+    parser.add_option("-c", "--catchup", type = "int", default = CATCHUPDAYS
+                    , help = "days back to import missed forecast times [%default]")
+    parser.add_option("--no-inotify", action = "store_false"
+                    , dest = "inotify", default = True
+                    , help = "just poll the file")
+    options, args = parser.parse_args()
 
-while True:
-    # poll the file - when was it last modified?
-    info = os.stat(filePath)
-    if previous_change != info.st_mtime:
-        process(filePath)
-        # reset so we can wait for the next change
-        previous_change = info.st_mtime
-    time.sleep(30*60)
+    filePath = options.file
+    manifest = BackfillManifest(options.manifest)
+    watcher = ForecastFileWatcher(filePath, options.poll, options.debounce
+                                , options.inotify)
 
+    print "Checking %s for inserting weather into %s (%s)" % \
+        (filePath, options.database
+       , "polling" if watcher.notifier is None else "inotify")
 
+    run(watcher, options.database, manifest, options.catchup)
 
+if __name__ == "__main__":
+    main()
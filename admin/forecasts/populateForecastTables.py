@@ -27,6 +27,7 @@
 
 
 from DBImport  import DBImport
+from utilities.DateRegistry import DateRegistry
 import TimeAgent
 from datetime import datetime, timedelta
 import sys
@@ -35,20 +36,15 @@ import settings
 
 # ================================ functions ==============================
 
-def fill(xs, forecast, date):
-    wind_speed = dbimport.correctWindSpeed(date, float(xs[3]))
+def fill(xs, forecast, date, wind_speed):
     w2_wind_speed = float(xs[2])
     r = \
         c.query("SELECT type_id FROM forecast_types WHERE type = '%s'" % forecast)
     forecast_id = r.dictresult()[0]["type_id"]
 
-    r = \
-        c.query("SELECT id FROM weather_dates WHERE date = '%s'" % date)
-    if len(r.dictresult()) == 0:
-        c.query("INSERT INTO weather_dates (date) VALUES ('%s')" % date)
-        r = \
-            c.query("SELECT id FROM weather_dates WHERE date = '%s'" % date)
-        weather_date_id = r.dictresult()[0]["id"]
+    weather_date_id = weatherDates.find(date)
+    if weather_date_id is None:
+        weather_date_id = weatherDates.get(date)
         
         q = """INSERT
                INTO weather_station2 (weather_date_id, wind_speed)
@@ -56,17 +52,15 @@ def fill(xs, forecast, date):
                                    , w2_wind_speed
                                      )
         c.query(q)
-    else:
-        weather_date_id = r.dictresult()[0]["id"]
 
     q = """INSERT
            INTO forecasts (forecast_type_id, weather_date_id, wind_speed)
-           VALUES (%s, %s, %s)""" % (forecast_id
-                                   , weather_date_id
-                                   , wind_speed
-                                     )
-    c.query(q)
-    r = c.query('SELECT id from forecasts ORDER BY id DESC LIMIT 1')
+           VALUES (%s, %s, %s)
+           RETURNING id""" % (forecast_id
+                            , weather_date_id
+                            , wind_speed
+                              )
+    r = c.query(q)
     id = r.dictresult()[0]["id"]
     for i in xrange(4, len(xs), 2):
         opacity = float(xs[i+0])
@@ -79,10 +73,13 @@ def fill(xs, forecast, date):
         c.query(q)
 
 def processFile(filename, forecast, date):
-    for line in open(filename):
-        xs = line.split()
-        fill(xs, forecast, date)
-        date += timedelta(hours = 1)
+    rows = [line.split() for line in open(filename)]
+    dates = [date + timedelta(hours = i) for i in range(len(rows))]
+    # correct the whole file's wind speeds at once
+    wind_speeds = dbimport.correctWindSpeeds(dates
+                                           , [float(xs[3]) for xs in rows])
+    for xs, date, wind_speed in zip(rows, dates, wind_speeds):
+        fill(xs, forecast, date, wind_speed)
 
 # ================================ program ================================
 
@@ -101,6 +98,10 @@ read_dir     = sys.argv[2]
 
 c = pg.connect(user="dss", dbname=database, port=settings.DATABASE_PORT)
 
+# every file covers the same hours, so read those dates in once
+weatherDates = DateRegistry(c, "weather_dates")
+weatherDates.preload(STARTDATE, STARTDATE + timedelta(days = 366))
+
 for suffix in SUFFIXES:
     filename = ''.join([PREFIX, suffix, '.txt'])
     readpath = ''.join([read_dir, '/', filename])
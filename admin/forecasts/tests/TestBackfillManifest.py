@@ -0,0 +1,70 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime         import datetime, timedelta
+from BackfillManifest import BackfillManifest
+import unittest
+import os
+import tempfile
+import shutil
+
+class TestBackfillManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "manifest.json")
+        start = datetime(2010, 6, 4)
+        self.fts = [start + timedelta(hours = 6 * i) for i in range(4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testResume(self):
+        m = BackfillManifest(self.path)
+        m.add(self.fts)
+        self.assertEquals(self.fts, m.getTodo())
+
+        m.setCompleted([self.fts[0]])
+        m.setFailed(self.fts[1], "Traceback")
+
+        # pick it up again, as if after an interruption
+        m = BackfillManifest(self.path)
+        self.assertTrue(m.isCompleted(self.fts[0]))
+        self.assertEquals([(self.fts[1], "Traceback")], m.getFailed())
+        # failures get retried
+        self.assertEquals(self.fts[1:], m.getTodo())
+        self.assertEquals([self.fts[1]], m.getTodo(self.fts[:2]))
+
+        # asking again for what's done doesn't redo it
+        m.add(self.fts)
+        self.assertEquals(self.fts[1:], m.getTodo())
+
+        m.setCompleted(self.fts[1:])
+        self.assertEquals([], m.getTodo())
+        self.assertEquals([], m.getFailed())
+        self.assertEquals(["manifest.json"], os.listdir(self.dir))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime        import datetime, timedelta
+from BackfillPlanner import BackfillPlanner
+from CleoStartTimes  import CleoStartTimes
+import unittest
+import os
+import pg
+import settings
+import tempfile
+import shutil
+
+class TestBackfillPlanner(unittest.TestCase):
+
+    def setUp(self):
+        # an archive with every six hours of 2010-06-03 but 06:00
+        self.dir = tempfile.mkdtemp()
+        start = datetime(2010, 6, 3)
+        self.available = [start + timedelta(hours = h) for h in (0, 12, 18)]
+        st = CleoStartTimes(self.dir, None)
+        for dt in self.available:
+            open("%s/nam_c27_%d.buf" % (self.dir, st.utc2ts(dt)), 'w').close()
+        self.planner = BackfillPlanner("weather_import_unit_tests", st)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testPlan(self):
+        start, end = datetime(2010, 6, 3), datetime(2010, 6, 4)
+        self.assertEquals(self.available
+                        , self.planner.getAvailable(start, end))
+
+        # what's imported already, or not available, isn't planned
+        imported = [datetime(2010, 6, 3, 6), datetime(2010, 6, 3, 12)]
+        self.assertEquals([datetime(2010, 6, 3), datetime(2010, 6, 3, 18)]
+                        , self.planner.plan(start, end, imported))
+
+        self.assertEquals([datetime(2010, 6, 3, 12)]
+            , self.planner.plan(datetime(2010, 6, 3, 6)
+                              , datetime(2010, 6, 3, 18), []))
+
+    def testGetImported(self):
+        cnn = pg.connect(user = "dss"
+                       , dbname = "weather_import_unit_tests"
+                       , port = settings.DATABASE_PORT)
+        cnn.query("TRUNCATE TABLE forecasts, forecast_times CASCADE")
+
+        # forecast times with and without forecasts, in and out of range
+        for h, forecasts in [(0, 0), (6, 2), (18, 1), (24, 1)]:
+            dt = datetime(2010, 6, 3) + timedelta(hours = h)
+            cnn.query("INSERT INTO forecast_times (date) VALUES ('%s')" % dt)
+            r = cnn.query("SELECT id FROM forecast_times WHERE date = '%s'" \
+                % dt)
+            id = r.dictresult()[0]['id']
+            for i in range(forecasts):
+                cnn.query("""
+                          INSERT INTO forecasts (forecast_time_id, wind_speed)
+                          VALUES (%d, 1.0)
+                          """ % id)
+
+        imported = self.planner.getImported(datetime(2010, 6, 3)
+                                          , datetime(2010, 6, 4))
+        self.assertEquals([datetime(2010, 6, 3, 6), datetime(2010, 6, 3, 18)]
+                        , sorted(imported))
+        self.assertEquals([datetime(2010, 6, 3, 18)]
+            , self.planner.getImported(datetime(2010, 6, 3, 7)
+                                     , datetime(2010, 6, 3, 19)))
+
+        cnn.query("TRUNCATE TABLE forecasts, forecast_times CASCADE")
+        cnn.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime         import datetime, timedelta
+from BackfillManifest import BackfillManifest
+import cleoDBBackfill
+import unittest
+import os
+import tempfile
+import shutil
+
+# 2010-06-03 12:00 fails to import
+FAILED = datetime(2010, 6, 3, 12)
+
+def fakeImport(args):
+    "Stands in for cleoDBBackfill.importForecastTime in the workers."
+    forecast_time, database, cacheDir = args
+    assert database == "weather_import_unit_tests"
+    if forecast_time == FAILED:
+        return (forecast_time, "Traceback: no NAM file")
+    return (forecast_time, None)
+
+class TestCleoDBBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.manifest = BackfillManifest(self.dir + "/manifest.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testGetForecastTimes(self):
+        start = datetime(2010, 6, 3)
+        fts = cleoDBBackfill.getForecastTimes(start
+                                            , start + timedelta(days = 1))
+        self.assertEquals([start + timedelta(hours = h)
+                           for h in (0, 6, 12, 18)], fts)
+
+    def testBackfill(self):
+        start = datetime(2010, 6, 3)
+        fts = cleoDBBackfill.getForecastTimes(start
+                                            , start + timedelta(days = 2))
+        self.manifest.add(fts)
+        failures = cleoDBBackfill.backfill("weather_import_unit_tests"
+                                         , fts
+                                         , processes = 3
+                                         , manifest = self.manifest
+                                         , importer = fakeImport)
+
+        self.assertEquals([(FAILED, "Traceback: no NAM file")], failures)
+        done = [ft for ft in fts if ft != FAILED]
+        self.assertEquals(done, self.manifest.getCompleted())
+        self.assertEquals([FAILED], self.manifest.getTodo())
+
+        # and the manifest made it to disk
+        manifest = BackfillManifest(self.dir + "/manifest.json")
+        self.assertEquals(done, manifest.getCompleted())
+        self.assertEquals([FAILED], manifest.getTodo())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -25,11 +25,15 @@ if __name__ == "__main__":
     sys.path[1:1] = [".."]
 
 from datetime import datetime, timedelta
-from CleoDBImport import CleoDBImport
+from CleoDBImport import CleoDBImport, CleoCommandError
+from ForecastBatch import ForecastBatch
+from CleoOutputCache import CleoOutputCache
 import unittest
 import pg
 import shutil
 import settings
+import os
+import time
 
 class TestCleoDBImport(unittest.TestCase):
 
@@ -80,11 +84,164 @@ class TestCleoDBImport(unittest.TestCase):
     def testFindForecastFiles(self):
         self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
 
+        # what our two cleo calls would have left in our scratch dir
+        self.cleo.makeRunDir()
+        runDir = self.cleo.runDir
+        os.makedirs(runDir + "/atmo/Forecasts_09_12_07_11h40m52s")
+        os.makedirs(runDir + "/wind/Forecasts_09_12_07_11h40m52s")
+
         files = self.cleo.findForecastFiles()        
-        exp = ('tests/Forecasts_09_12_07_11h40m52s/time_avrg_09_12_07_11h40m52s.txt'
-             , 'tests/Forecasts_09_12_07_11h40m57s/time_avrg_09_12_07_11h40m57s.txt')
+        exp = (runDir + '/atmo/Forecasts_09_12_07_11h40m52s/time_avrg_09_12_07_11h40m52s.txt'
+             , runDir + '/wind/Forecasts_09_12_07_11h40m52s/time_avrg_09_12_07_11h40m52s.txt')
         self.assertEquals(exp, files)        
 
+        # clean up after ourselves
+        self.cleo.cleanUpRunDir()
+        self.assertFalse(os.path.exists(runDir))
+
+    def testCachedForecastFiles(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests", True)
+        cacheDir = "tests/CleoCache"
+        self.cleo.cache = CleoOutputCache(cacheDir)
+        for name, cmdLine, src in [
+            ("atmo", self.cleo.atmoCmdLine, "tests/test_freq_vals.txt")
+          , ("wind", self.cleo.windCmdLine, "tests/test_winds.txt")]:
+            self.cleo.cache.put(self.cleo.cache.key(self.forecast, cmdLine)
+                              , src)
+        # cleo mustn't get called
+        def getWeather(cmdLines = None):
+            self.fail("cleo was called")
+        self.cleo.getWeather = getWeather
+
+        atmFile, windFile = self.cleo.getForecastFiles()
+        self.assertEquals(open("tests/test_freq_vals.txt").read()
+                        , open(atmFile).read())
+        self.assertEquals(open("tests/test_winds.txt").read()
+                        , open(windFile).read())
+
+        # they're our own links, which the cache can't take away
+        self.assertEquals(self.cleo.runDir + "/wind.txt", windFile)
+        shutil.rmtree(cacheDir)
+        self.assertEquals(open("tests/test_winds.txt").read()
+                        , open(windFile).read())
+        self.cleo.cleanUpRunDir()
+
+    def testCacheOnlyParsed(self):
+        forecast = datetime(2010, 6, 4, 18)
+        self.cleo = CleoDBImport(forecast, self.dbname, "tests", True)
+        cacheDir = "tests/CleoCache"
+        self.cleo.cache = CleoOutputCache(cacheDir)
+
+        # cleo leaves the given output behind
+        outputs = {}
+        def getWeather(cmdLines = None):
+            for name, _ in cmdLines:
+                dir = self.cleo.runDir + "/" + name \
+                    + "/Forecasts_09_12_07_11h40m52s"
+                os.makedirs(dir)
+                shutil.copyfile(outputs[name]
+                              , dir + "/time_avrg_09_12_07_11h40m52s.txt")
+        self.cleo.getWeather = getWeather
+
+        # output we can't read isn't cached, so a retry calls cleo again
+        outputs["atmo"] = "tests/test_freq_vals.txt"
+        outputs["wind"] = "tests/test_freq_vals.txt"
+        self.cleo.runCleo()
+        self.assertEquals([], self.cleo.cache.files())
+        self.assertRaises(Exception, self.cleo.parse)
+        self.assertEquals([], self.cleo.cache.files())
+        self.cleo.cleanUpRunDir()
+
+        # but what we could read is
+        outputs["wind"] = "tests/test_winds.txt"
+        self.cleo.runCleo()
+        self.cleo.parse()
+        self.assertEquals(2, len(self.cleo.cache.files()))
+        key = self.cleo.cache.key(forecast, self.cleo.windCmdLine)
+        self.assertEquals(open("tests/test_winds.txt").read()
+                        , open(self.cleo.cache.get(key)).read())
+        self.cleo.cleanUpRunDir()
+        shutil.rmtree(cacheDir)
+
+    def startedCleos(self):
+        "Keeps the cleo processes getWeather starts, for inspection."
+        procs = []
+        startCleo = self.cleo.startCleo
+        def recordingStartCleo(name, cmdLine):
+            proc = startCleo(name, cmdLine)
+            procs.append(proc)
+            return proc
+        self.cleo.startCleo = recordingStartCleo
+        return procs
+
+    def testGetWeatherTimeout(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
+        self.cleo.cleoTimeout = 1
+        procs = self.startedCleos()
+
+        # cleo gets killed, rather than left to hang
+        start = time.time()
+        self.assertRaises(CleoCommandError, self.cleo.getWeather
+                        , [("atmo", "sleep 5")])
+        self.assertTrue(time.time() - start < 4)
+        self.assertEquals(1, len(procs))
+        self.assertTrue(procs[0][1].returncode < 0)
+        self.cleo.cleanUpRunDir()
+
+    def testGetWeatherErrors(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
+
+        # a failed call is an error, whatever the others did
+        try:
+            self.cleo.getWeather([("atmo", "true"), ("wind", "false")])
+            self.fail("cleo's failure went unnoticed")
+        except CleoCommandError, e:
+            self.assertTrue("cleo (wind) exited with status 1" in str(e))
+        self.cleo.cleanUpRunDir()
+
+        # and comes with what it had to say
+        try:
+            self.cleo.getWeather([("atmo"
+                                 , "sh -c 'echo no NAM data >&2; exit 2'")])
+            self.fail("cleo's failure went unnoticed")
+        except CleoCommandError, e:
+            self.assertTrue("status 2: no NAM data" in str(e))
+        self.cleo.cleanUpRunDir()
+
+        # which is reported even when it succeeds
+        self.cleo.getWeather([("wind", "sh -c 'echo just a warning >&2'")])
+        self.assertTrue("cleo (wind) stderr: just a warning" \
+            in self.cleo.report)
+        self.cleo.cleanUpRunDir()
+
+    def testGetWeatherConcurrent(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
+        procs = self.startedCleos()
+
+        # the calls run side by side, not one after another
+        start = time.time()
+        self.cleo.getWeather([("atmo", "sleep 2"), ("wind", "sleep 2")])
+        self.assertTrue(time.time() - start < 4)
+        self.assertEquals([0, 0], [p.returncode for _, p, _ in procs])
+        self.assertTrue(abs(self.cleo.cleoStarts["atmo"]
+                          - self.cleo.cleoStarts["wind"]) < 1)
+        for name in ["atmo", "wind"]:
+            self.assertTrue(os.path.isdir(self.cleo.runDir + "/" + name))
+        self.cleo.cleanUpRunDir()
+
+    def testArchiveRunDir(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
+        self.cleo.archive = True
+        self.cleo.makeRunDir()
+        runDir = self.cleo.runDir
+        os.makedirs(runDir + "/atmo/Forecasts_09_12_07_11h40m52s")
+
+        self.cleo.cleanUpRunDir()
+
+        self.assertFalse(os.path.exists(runDir))
+        self.assertTrue(os.path.exists(runDir + ".tar.gz"))
+        os.remove(runDir + ".tar.gz")
+
     def testRead(self):
         cleo = CleoDBImport(6, "")
         #cleo.forecast_time = datetime(2009, 12, 1, 6, 0, 0)
@@ -95,7 +252,7 @@ class TestCleoDBImport(unittest.TestCase):
 
         # First row
         #timestamp = cleo.data[0][0]    # 2009-11-30 23:00:00 UTC
-        timestamp = cleo.data[0][0]    # 2010-06-04 09:00:00 UTC
+        timestamp = cleo.data.timestamps[0]    # 2010-06-04 09:00:00 UTC
         # We expect this to be the first timestamp since cleo gives
         # you a 12 hour buffer from *before* you *asked* for the forecasts
         ## And we asked for these at 2009-12-1 11:40:00 (rounded to hour)
@@ -105,64 +262,68 @@ class TestCleoDBImport(unittest.TestCase):
         self.assertEquals(expTimestamp, timestamp)
 
         # The mph wind is something you can see for yourself in the file
-        wind_mph = cleo.data[0][1]['speed_mph']
+        wind_mph = cleo.data.speed_mph[0]
         self.assertEquals(6.0145, wind_mph)
         # The rest of these we derive from the file
-        wind_ms = cleo.data[0][1]['speed_ms']
+        wind_ms = cleo.data.speed_ms[0]
         self.assertAlmostEquals(1.3041921, wind_ms, 4)  
         # Should be a really old forecast
-        ftype_id = cleo.data[0][1]['forecast_type_id']
+        ftype_id = cleo.data.forecast_type_ids[0]
         self.assertEquals(1, ftype_id)
 
         # Middle row
-        timestamp = cleo.data[52][0]
+        timestamp = cleo.data.timestamps[52]
         expTimestamp = datetime(2010, 6, 6, 13, 0, 0)
         self.assertEquals(expTimestamp, timestamp)
-        wind_mph = cleo.data[52][1]['speed_mph']
+        wind_mph = cleo.data.speed_mph[52]
         self.assertEquals(17.181, wind_mph)
-        wind_ms = cleo.data[52][1]['speed_ms']
+        wind_ms = cleo.data.speed_ms[52]
         self.assertAlmostEquals(6.20667, wind_ms, 4)     
-        ftype_id = cleo.data[52][1]['forecast_type_id']
+        ftype_id = cleo.data.forecast_type_ids[52]
         self.assertEquals(8, ftype_id)
         
         # Last row - for some reason this test file doesn't have 3.5 days
         # into the future of data.
         last_row = 87
-        timestamp = cleo.data[last_row][0]
+        timestamp = cleo.data.timestamps[last_row]
         expTimestamp = datetime(2010, 6, 8)
         self.assertEquals(expTimestamp, timestamp)
-        wind_mph = cleo.data[last_row][1]['speed_mph']
+        wind_mph = cleo.data.speed_mph[last_row]
         self.assertEquals(7.30825, wind_mph)
-        wind_ms = cleo.data[last_row][1]['speed_ms']
+        wind_ms = cleo.data.speed_ms[last_row]
         self.assertAlmostEquals(3.865914, wind_ms, 4)     
-        ftype_id = cleo.data[last_row][1]['forecast_type_id']
+        ftype_id = cleo.data.forecast_type_ids[last_row]
         self.assertEquals(14, ftype_id)
 
         # Atmosphere File
 
         # First row
-        self.assertEquals(85, len(cleo.data[0][1]['tauCleo']))
-        self.assertEquals(85, len(cleo.data[0][1]['tSysCleo']))
-        self.assertEquals(85, len(cleo.data[0][1]['tAtmCleo']))
-        tau = cleo.data[0][1]['tauCleo'][0]  # tau @ freq[0] GHz @ 2009-11-30 23:00
+        self.assertEquals((88, 85), cleo.data.tau.shape)
+        self.assertEquals((88, 85), cleo.data.tsys.shape)
+        self.assertEquals((88, 85), cleo.data.tatm.shape)
+        self.assertEquals(85, len(cleo.data.freqs))
+        self.assertTrue(cleo.data.hasAtmo.all())
+        tau = cleo.data.tau[0][0]  # tau @ freq[0] GHz @ 2009-11-30 23:00
         self.assertEquals(0.00782361636839, tau)
-        tau = cleo.data[0][1]['tauCleo'][21]  # tau @ freq[21] GHz @ 2009-11-30 23:00
+        tau = cleo.data.tau[0][21]  # tau @ freq[21] GHz @ 2009-11-30 23:00
         self.assertEquals(0.316691921831, tau)
-        tAtm = cleo.data[0][1]['tAtmCleo'][49] # tatm @ freq[49] GHz @ 2009-11-30 23
+        tAtm = cleo.data.tatm[0][49] # tatm @ freq[49] GHz @ 2009-11-30 23
         self.assertEquals(267.676350343, tAtm)
 
         # Middle row
         row = 52
-        self.assertEquals(85, len(cleo.data[row][1]['tauCleo']))
-        self.assertEquals(85, len(cleo.data[row][1]['tSysCleo']))
-        self.assertEquals(85, len(cleo.data[row][1]['tAtmCleo']))
-        tau = cleo.data[row][1]['tauCleo'][0]  # tau @ 1 GHz @ ?
+        tau = cleo.data.tau[row][0]  # tau @ 1 GHz @ ?
         self.assertEquals(0.00700377123625, tau)
-        tau = cleo.data[row][1]['tauCleo'][21]  # tau @22 GHz @ ?
+        tau = cleo.data.tau[row][21]  # tau @22 GHz @ ?
         self.assertEquals(0.261487543705, tau)
-        tAtm = cleo.data[row][1]['tAtmCleo'][49] # tatm @50 GHz @ ? 
+        tAtm = cleo.data.tatm[row][49] # tatm @50 GHz @ ? 
         self.assertEquals(277.080140861, tAtm)
 
+        # each phase of the parsing was timed
+        phases = [(p["phase"], p["rows"]) for p in cleo.timings.phases]
+        self.assertEquals([("parse wind", 88), ("wind correction", 88)
+                         , ("parse atmosphere", 88)], phases)
+
     def truncateTables(self, cnn):
 
         # truncat tables of interest
@@ -201,16 +362,12 @@ class TestCleoDBImport(unittest.TestCase):
         speed_ms  = 10.0
         speed_mph = 11.0
         irradiance = 300.0
-        dataDct = dict(forecast_type_id = forecast_type_id
-                     , speed_ms         = speed_ms
-                     , speed_mph        = speed_mph
-                     , irradiance       = irradiance
-                     , tauCleo          = tauCleo
-                     , tSysCleo         = tSysCleo
-                     , tAtmCleo         = tAtmCleo
-                     , freqs            = freqs
-                     )
-        self.cleo.data = [(dt, dataDct)]             
+        batch = ForecastBatch([dt], [forecast_type_id], freqs)
+        batch.speed_ms[0]   = speed_ms
+        batch.speed_mph[0]  = speed_mph
+        batch.irradiance[0] = irradiance
+        batch.setAtmosphere([dt], [tauCleo], [tSysCleo], [tAtmCleo])
+        self.cleo.data = batch
         
         # insert the data!
         self.cleo.insert()
@@ -267,6 +424,118 @@ class TestCleoDBImport(unittest.TestCase):
         r = cnn.query(q)
         self.assertEquals(3, len(r.dictresult()))
 
+    def testInsertBulk(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests"
+                               , bulk = True)
+
+        cnn = pg.connect(user = "dss", dbname = self.dbname, port = settings.DATABASE_PORT)
+        self.truncateTables(cnn)
+
+        # create test data: two hours, the second one w/ out atmosphere
+        dt1 = datetime(2009, 1, 22, 6, 0, 0)
+        dt2 = datetime(2009, 1, 22, 7, 0, 0)
+        freqs     = [2, 4, 6]
+        tauCleo   = [1.0, 2.0, 3.0]
+        tAtmCleo  = [7.0, 8.0, 9.0]
+        batch = ForecastBatch([dt1, dt2], [13, 13], freqs)
+        batch.speed_ms[:]   = 10.0
+        batch.speed_mph[:]  = 11.0
+        batch.irradiance[:] = 300.0
+        batch.setAtmosphere([dt1], [tauCleo], [[4.0, 5.0, 6.0]], [tAtmCleo])
+        self.cleo.data = batch
+
+        self.cleo.insert()
+
+        r = cnn.query("SELECT * FROM weather_dates")
+        self.assertEquals(1, len(r.dictresult()))
+        self.assertEquals(str(dt1), r.dictresult()[0]['date'])
+        r = cnn.query("SELECT * from forecasts")
+        self.assertEquals(1, len(r.dictresult()))
+        self.assertEquals(10.0, r.dictresult()[0]['wind_speed'])
+        forecast_id = r.dictresult()[0]['id']
+        r = cnn.query("SELECT * from forecast_by_frequency ORDER BY frequency")
+        self.assertEquals(3, len(r.dictresult()))
+        for i in range(3):
+            self.assertEquals(freqs[i],    r.dictresult()[i]['frequency'])
+            self.assertEquals(tauCleo[i],  r.dictresult()[i]['opacity'])
+            self.assertEquals(tAtmCleo[i], r.dictresult()[i]['tsys'])
+            self.assertEquals(forecast_id, r.dictresult()[i]['forecast_id'])
+        report = " ".join(self.cleo.report)
+        self.assertTrue("Got wind but not atmosphere" in report)
+
+        # inserting the data again changes nothing
+        self.cleo.insert()
+        r = cnn.query("SELECT * from forecasts")
+        self.assertEquals(1, len(r.dictresult()))
+        r = cnn.query("SELECT * from forecast_by_frequency")
+        self.assertEquals(3, len(r.dictresult()))
+
+        # a failed import leaves nothing behind
+        self.truncateTables(cnn)
+        batch.tau[0][2] = float('nan')
+        self.assertRaises(Exception, self.cleo.insert)
+        for t in ['forecast_times', 'import_times', 'weather_dates'
+                , 'forecasts', 'forecast_by_frequency']:
+            r = cnn.query("SELECT * FROM %s" % t)
+            self.assertEquals(0, len(r.dictresult()))
+
+    def testInsertBulkLostConnection(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests"
+                               , bulk = True)
+
+        # the connection dies part way through the import
+        queries = []
+        class DeadConnection:
+            closed = False
+            def query(self, q):
+                queries.append(q)
+                if q != "BEGIN":
+                    raise Exception("server closed the connection")
+            def close(self):
+                self.closed = True
+        def connect():
+            self.cleo.c = DeadConnection()
+        self.cleo.connect = connect
+        def insertBulkRows():
+            raise ValueError("bad forecast")
+        self.cleo.insertBulkRows = insertBulkRows
+
+        # we hear about what went wrong, not the failed ROLLBACK
+        self.assertRaises(ValueError, self.cleo.insertBulk)
+        self.assertEquals(["BEGIN", "ROLLBACK"], queries)
+        self.assertTrue(self.cleo.c.closed)
+
+    def testLockDates(self):
+        self.cleo = CleoDBImport(self.forecast, self.dbname, "tests"
+                               , bulk = True)
+        self.cleo.connect()
+        self.cleo.c.query("BEGIN")
+        self.cleo.lockDates()
+
+        # everyone else can still read the dates, but not add to them
+        # until we're done
+        cnn = pg.connect(user = "dss", dbname = self.dbname, port = settings.DATABASE_PORT)
+        r = cnn.query("""
+                      SELECT c.relname
+                      FROM pg_locks AS l, pg_class AS c
+                      WHERE l.relation = c.oid
+                        AND l.mode = 'ShareRowExclusiveLock'
+                        AND l.granted
+                      ORDER BY c.relname
+                      """)
+        self.assertEquals(['forecast_times', 'import_times', 'weather_dates']
+                        , [row['relname'] for row in r.dictresult()])
+        cnn.query("SELECT * FROM weather_dates")
+
+        self.cleo.c.query("ROLLBACK")
+        r = cnn.query("""
+                      SELECT * FROM pg_locks
+                      WHERE mode = 'ShareRowExclusiveLock'
+                      """)
+        self.assertEquals(0, len(r.dictresult()))
+        cnn.close()
+        self.cleo.c.close()
+
     def testImport(self):
         self.cleo = CleoDBImport(self.forecast, self.dbname, "tests")
 
@@ -284,10 +553,8 @@ class TestCleoDBImport(unittest.TestCase):
         report = " ".join(self.cleo.report)
         self.assertTrue("Inserting data for forecast" in report)
 
-        # clean up the files
-        for type, file in self.cleo.files.items():
-            dir = file.split("/")[1]
-            #shutil.rmtree(dir)
+        # the cleo files were cleaned up for us
+        self.assertEquals(None, self.cleo.runDir)
 
     def testHistoryImport(self):
         self.cleo = CleoDBImport(self.forecast, self.dbname, "tests", True)
@@ -306,10 +573,8 @@ class TestCleoDBImport(unittest.TestCase):
         report = " ".join(self.cleo.report)
         self.assertTrue("Inserting data for forecast" in report)
 
-        # clean up the files
-        for type, file in self.cleo.files.items():
-            dir = file.split("/")[1]
-            #shutil.rmtree(dir)
+        # the cleo files were cleaned up for us
+        self.assertEquals(None, self.cleo.runDir)
 
 if __name__ == "__main__":
     #unittest.main()
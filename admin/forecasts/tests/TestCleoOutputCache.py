@@ -0,0 +1,100 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime        import datetime
+from CleoOutputCache import CleoOutputCache
+import unittest
+import os
+import tempfile
+import shutil
+
+class TestCleoOutputCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = CleoOutputCache(self.dir + "/cache")
+        self.ft = datetime(2010, 6, 4, 6)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testKey(self):
+        key = self.cache.key(self.ft, "forecastsCmdLine -freqList 2 3")
+        self.assertEquals(40, len(key))
+        self.assertEquals(key
+            , self.cache.key(self.ft, "forecastsCmdLine -freqList 2 3"))
+        self.assertNotEquals(key
+            , self.cache.key(self.ft, "forecastsCmdLine -freqList 2 4"))
+        self.assertNotEquals(key
+            , self.cache.key(datetime(2010, 6, 4, 12)
+                           , "forecastsCmdLine -freqList 2 3"))
+
+    def testPutGet(self):
+        key = self.cache.key(self.ft, "forecastsCmdLine")
+        self.assertEquals(None, self.cache.get(key))
+
+        path = self.cache.put(key, "tests/test_winds.txt")
+        self.assertEquals(path, self.cache.get(key))
+        self.assertEquals(open("tests/test_winds.txt").read()
+                        , open(path).read())
+        # no temporary files left behind
+        self.assertEquals([key + ".txt"], os.listdir(self.cache.dir))
+
+    def testGetTo(self):
+        key = self.cache.key(self.ft, "forecastsCmdLine")
+        dest = self.dir + "/wind.txt"
+        self.assertEquals(None, self.cache.get(key, dest))
+        self.assertFalse(os.path.exists(dest))
+
+        self.cache.put(key, "tests/test_winds.txt")
+        self.assertEquals(dest, self.cache.get(key, dest))
+
+        # our copy outlives its eviction
+        self.cache.maxBytes = 0
+        self.cache.evict()
+        self.assertEquals(None, self.cache.get(key))
+        self.assertEquals(open("tests/test_winds.txt").read()
+                        , open(dest).read())
+
+    def testEvict(self):
+        size = os.path.getsize("tests/test_winds.txt")
+        self.cache.maxBytes = 2 * size
+        keys = [self.cache.key(self.ft, "cmd %d" % i) for i in range(3)]
+
+        self.cache.put(keys[0], "tests/test_winds.txt")
+        self.cache.put(keys[1], "tests/test_winds.txt")
+        os.utime(self.cache.path(keys[0]), (1000, 1000))
+        os.utime(self.cache.path(keys[1]), (2000, 2000))
+        # a hit makes keys[0] the most recently used
+        self.cache.get(keys[0])
+
+        self.cache.put(keys[2], "tests/test_winds.txt")
+        self.assertNotEquals(None, self.cache.get(keys[0]))
+        self.assertEquals(None, self.cache.get(keys[1]))
+        self.assertNotEquals(None, self.cache.get(keys[2]))
+        self.assertEquals(2 * size, self.cache.size())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from datetime       import datetime
+from CleoOutputFile import CleoOutputFile
+import unittest
+
+class TestCleoOutputFile(unittest.TestCase):
+
+    def testWindFile(self):
+        f = CleoOutputFile("tests/test_winds.txt")
+
+        self.assertEquals(88, len(f))
+        self.assertEquals(16, len(f.header))
+        self.assertEquals(2, f.columns["smphTimeList_avrg"])
+
+        speeds = f.column("smphTimeList_avrg")
+        self.assertEquals(6.0145, speeds[0])
+        self.assertEquals(17.181, speeds[52])
+        self.assertEquals(55351.375, f.mjds()[0])
+
+        hours = f.hours()
+        self.assertEquals(datetime(2010, 6, 4, 9), hours[0])
+        self.assertEquals(datetime(2010, 6, 4, 10), hours[1])
+        self.assertEquals(datetime(2010, 6, 8), hours[87])
+
+    def testAtmoFile(self):
+        f = CleoOutputFile("tests/test_freq_vals.txt")
+
+        tau = f.table(["OpacityTime2List_avrg", "OpacityTime23List_avrg"])
+        self.assertEquals((88, 2), tau.shape)
+        self.assertEquals(0.00782361636839, tau[0, 0])
+        self.assertEquals(0.316691921831, tau[0, 1])
+        self.assertEquals(0.261487543705, tau[52, 1])
+
+    def testHeader(self):
+        header = open("tests/test_winds.txt").readline()
+        f = CleoOutputFile("tests/test_winds.txt", header)
+        self.assertEquals(header.split(), f.header)
+
+        self.assertRaises(AssertionError
+                        , CleoOutputFile
+                        , "tests/test_freq_vals.txt"
+                        , header)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime       import datetime
+from CleoStartTimes import CleoStartTimes
+import unittest
+import os
+import tempfile
+import shutil
+import zipfile
+
+class TestCleoStartTimes(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.archive = self.dir + "/ArchiveNAM"
+        os.mkdir(self.archive)
+        self.catalog = self.dir + "/catalog.json"
+
+        # 2010-06-03 12:00, 18:00 and 2010-06-04 00:00 UTC
+        self.touch("nam_c27_1275566400.buf")
+        self.zip("nam_c27_1275588000.zip", ["nam_c27_1275588000.buf"
+                                          , "nam_c27_1275566400.buf"])
+        self.zip("nam_c27_1275609600.zip", ["nam_c27_1275609600.buf"])
+        self.touch("README")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def touch(self, name):
+        open(self.archive + "/" + name, 'w').close()
+
+    def zip(self, name, members):
+        zf = zipfile.ZipFile(self.archive + "/" + name, "w")
+        for m in members:
+            zf.writestr(m, "")
+        zf.close()
+
+    def testGet(self):
+        st = CleoStartTimes(self.archive, self.catalog)
+        exp = [datetime(2010, 6, 3, 12), datetime(2010, 6, 3, 18)
+             , datetime(2010, 6, 4)]
+        self.assertEquals(exp, st.get())
+        self.assertEquals(4, len(st.get_filenames()))
+
+        self.assertEquals(exp[1:2], st.getRange(datetime(2010, 6, 3, 13)
+                                              , datetime(2010, 6, 4)))
+        self.assertEquals(exp, st.getRange(datetime(2010, 6, 3)
+                                         , datetime(2010, 6, 5)))
+        self.assertTrue(st.contains(datetime(2010, 6, 3, 18)))
+        self.assertFalse(st.contains(datetime(2010, 6, 3, 19)))
+
+    def testCatalog(self):
+        path = self.archive + "/nam_c27_1275609600.zip"
+        os.utime(path, (1000, 1000))
+        st = CleoStartTimes(self.archive, self.catalog)
+        self.assertEquals(3, len(st.get()))
+        self.assertTrue(os.path.exists(self.catalog))
+
+        # a fresh instance reads the zips from the catalog, not the zips
+        # (which we break, without them looking changed, to prove it)
+        size = os.path.getsize(path)
+        f = open(path, 'w')
+        f.write("x" * size)
+        f.close()
+        os.utime(path, (1000, 1000))
+        st = CleoStartTimes(self.archive, self.catalog)
+        self.assertEquals(3, len(st.get()))
+
+        # new and changed files are picked up
+        self.touch("nam_c27_1275631200.buf")
+        self.zip("nam_c27_1275609600.zip", ["nam_c27_1275609600.buf"
+                                          , "nam_c27_1275652800.buf"])
+        os.utime(self.archive, (0, 0))
+        self.assertEquals(datetime(2010, 6, 4, 12), st.get()[-1])
+        self.assertEquals(5, len(st.get()))
+
+        # and removed ones are dropped
+        os.remove(self.archive + "/nam_c27_1275609600.zip")
+        os.utime(self.archive, (1, 1))
+        self.assertEquals(3, len(st.get()))
+
+if __name__ == "__main__":
+    unittest.main()
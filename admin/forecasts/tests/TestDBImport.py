@@ -0,0 +1,61 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime import datetime, timedelta
+from DBImport import DBImport
+import unittest
+import numpy
+
+class TestDBImport(unittest.TestCase):
+
+    def setUp(self):
+        self.dbimport = DBImport()
+
+    def testCorrectWindSpeed(self):
+        night = datetime(2010, 1, 1, 6)
+        day   = datetime(2010, 1, 1, 18)
+        self.assertAlmostEquals(0.0, self.dbimport.correctWindSpeed(night, 0.0))
+        self.assertAlmostEquals(4.22734, self.dbimport.correctWindSpeed(day, 4.0), 5)
+        self.assertAlmostEquals(2.17845, self.dbimport.correctWindSpeed(night, 4.0), 5)
+        # no correction above 11.1 m/s
+        self.assertEquals(12.0, self.dbimport.correctWindSpeed(day, 12.0))
+
+    def testCorrectWindSpeeds(self):
+        start = datetime(2010, 1, 1)
+        dts = [start + timedelta(hours = i) for i in range(72)]
+        speeds = numpy.arange(72) * 0.2
+
+        exp = [self.dbimport.correctWindSpeed(dt, s) \
+            for dt, s in zip(dts, speeds)]
+        corrected = self.dbimport.correctWindSpeeds(dts, speeds)
+        self.assertEquals(72, len(corrected))
+        for e, c in zip(exp, corrected):
+            self.assertAlmostEquals(e, c, 10)
+        self.assertTrue((corrected >= 0.0).all())
+
+        self.assertEquals(0, len(self.dbimport.correctWindSpeeds([], [])))
+
+if __name__ == "__main__":
+    unittest.main()
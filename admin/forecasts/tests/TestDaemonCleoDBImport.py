@@ -0,0 +1,140 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime         import datetime, timedelta
+from BackfillManifest import BackfillManifest
+import daemonCleoDBImport
+import unittest
+import os
+import tempfile
+import threading
+import shutil
+
+class TestDaemonCleoDBImport(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filePath = self.dir + "/TS_c27_NAM"
+        self.write("1259928000 12:00:00 04Dec09\n", 1000)
+        self.ft = datetime(2009, 12, 4, 12)
+        self.manifest = BackfillManifest(self.dir + "/manifest.json")
+        self.process = daemonCleoDBImport.process
+        self.CleoDBImport = daemonCleoDBImport.CleoDBImport
+
+    def tearDown(self):
+        daemonCleoDBImport.process = self.process
+        daemonCleoDBImport.CleoDBImport = self.CleoDBImport
+        shutil.rmtree(self.dir)
+
+    def write(self, line, mtime):
+        f = open(self.filePath, 'w')
+        f.write(line)
+        f.close()
+        os.utime(self.filePath, (mtime, mtime))
+
+    def watcher(self):
+        return daemonCleoDBImport.ForecastFileWatcher(self.filePath
+                                                    , pollInterval = 0.05
+                                                    , debounce = 0.01
+                                                    , useInotify = False)
+
+    def testParseForecastTime(self):
+        self.assertEquals(self.ft, daemonCleoDBImport.parseForecastTime( \
+            "1259928000 12:00:00 04Dec09\n"))
+
+    def testPoll(self):
+        watcher = self.watcher()
+        self.assertEquals(None, watcher.notifier)
+
+        # a changed file is returned straight away
+        self.assertEquals(1000, watcher.wait(0))
+
+        # otherwise we poll until it changes
+        timer = threading.Timer(0.2, self.write
+                              , ["1259949600 18:00:00 04Dec09\n", 2000])
+        timer.start()
+        self.assertEquals(2000, watcher.wait(1000))
+        timer.join()
+
+    def testSettle(self):
+        # the file's still being written, then disappears for a moment
+        watcher = self.watcher()
+        mtimes = [1, 2, None, 3, 3, 4]
+        watcher.mtime = lambda: mtimes.pop(0)
+        self.assertEquals(3, watcher.settle(0))
+        self.assertEquals([4], mtimes)
+
+    def testAlreadyImported(self):
+        def CleoDBImport(*args, **kws):
+            self.fail("imported again")
+        daemonCleoDBImport.CleoDBImport = CleoDBImport
+        self.manifest.setCompleted([self.ft])
+        daemonCleoDBImport.process(self.filePath, "weather_unit_tests"
+                                 , self.manifest)
+
+    def testGetMissedForecastTimes(self):
+        get = daemonCleoDBImport.getMissedForecastTimes
+        hours = lambda h: self.ft - timedelta(hours = h)
+
+        # nothing to go on without a manifest, or imports in it
+        self.assertEquals([], get(self.ft, None))
+        self.assertEquals([], get(self.ft, self.manifest))
+
+        # not before the first import
+        self.manifest.setCompleted([hours(24), hours(12)])
+        self.assertEquals([hours(18), hours(6)], get(self.ft, self.manifest))
+
+        # nor before the days we catch up on
+        self.manifest.setCompleted([hours(24 * 10)])
+        missed = get(self.ft, self.manifest, catchUpDays = 2)
+        self.assertEquals([hours(48), hours(42), hours(36), hours(30)
+                         , hours(18), hours(6)], missed)
+        # a week of six hourly times, less the two imported in it
+        self.assertEquals(28 - 2, len(get(self.ft, self.manifest)))
+
+        # an earlier forecast time only looks back from there
+        self.assertEquals([hours(36), hours(30), hours(18)]
+                        , get(hours(12), self.manifest, catchUpDays = 1))
+
+    def testRetry(self):
+        # the first import fails, so is tried again after a poll
+        calls = []
+        def process(filePath, database, manifest, catchUpDays):
+            calls.append((filePath, database))
+            if len(calls) == 1:
+                raise Exception("cleo hung")
+        daemonCleoDBImport.process = process
+        watcher = self.watcher()
+        sleeps = []
+        def sleep():
+            sleeps.append(True)
+        watcher.sleep = sleep
+
+        daemonCleoDBImport.run(watcher, "weather_unit_tests", self.manifest
+                             , attempts = 2)
+        self.assertEquals([(self.filePath, "weather_unit_tests")] * 2, calls)
+        self.assertEquals(1, len(sleeps))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from ImportPipeline import ImportPipeline
+import unittest
+import threading
+import time
+
+class FakeImport:
+
+    "Stands in for a CleoDBImport, recording what was done to it."
+
+    def __init__(self, forecast_time, log, failAt = None):
+        self.forecast_time = forecast_time
+        self.log = log
+        self.failAt = failAt
+        self.cleanedUp = False
+
+    def step(self, name):
+        self.log.append((name, self.forecast_time, time.time()))
+        if name == self.failAt:
+            raise Exception("%s failed" % name)
+        # cleo is the slow part
+        time.sleep(0.1 if name == "cleo" else 0.02)
+
+    def runCleo(self):
+        self.step("cleo")
+
+    def parse(self):
+        self.step("parse")
+
+    def insert(self):
+        self.step("insert")
+
+    def cleanUpRunDir(self):
+        self.cleanedUp = True
+
+    def reportToFile(self):
+        self.step("report")
+
+class TestImportPipeline(unittest.TestCase):
+
+    def testRun(self):
+        log = []
+        imports = [FakeImport(i, log) for i in range(6)]
+        done = []
+        p = ImportPipeline(imports, onDone = lambda c, e: done.append(c))
+        results = p.run()
+
+        self.assertEquals(6, len(results))
+        self.assertEquals(range(6), sorted([c.forecast_time \
+            for c, e in results]))
+        self.assertEquals([None] * 6, [e for c, e in results])
+        self.assertEquals([c for c, e in results], done)
+        self.assertTrue(min([c.cleanedUp for c in imports]))
+        # every step of every import was done, in order
+        for c in imports:
+            steps = [name for name, ft, _ in log if ft == c.forecast_time]
+            self.assertEquals(["cleo", "parse", "insert", "report"], steps)
+
+        # the stages overlapped: a later cleo started before an earlier
+        # import was written to the DB
+        firstInsert = min([t for name, ft, t in log if name == "insert"])
+        lastCleo = max([t for name, ft, t in log if name == "cleo"])
+        self.assertTrue(lastCleo > firstInsert)
+
+    def testFailure(self):
+        log = []
+        imports = [FakeImport(0, log, failAt = "parse")
+                 , FakeImport(1, log)
+                 , FakeImport(2, log, failAt = "cleo")]
+        results = dict([(c.forecast_time, e) \
+            for c, e in ImportPipeline(imports).run()])
+
+        self.assertEquals(None, results[1])
+        self.assertTrue("parse failed" in results[0])
+        self.assertTrue("cleo failed" in results[2])
+        # failed imports skip the rest of the steps, but are cleaned up
+        self.assertEquals(["cleo", "parse"]
+                        , [name for name, ft, _ in log if ft == 0])
+        self.assertEquals(["cleo"], [name for name, ft, _ in log if ft == 2])
+        self.assertTrue(min([c.cleanedUp for c in imports]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright (C) 2009 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 675 Mass Ave Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#     GBT Operations
+#     National Radio Astronomy Observatory
+#     P. O. Box 2
+#     Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+from datetime      import datetime
+from ImportTimings import ImportTimings, QueryCounter
+import unittest
+import json
+import os
+import tempfile
+
+class FakeConnection:
+
+    "Just remembers the queries it was given."
+
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+
+    def query(self, q):
+        self.queries.append(q)
+
+    def close(self):
+        self.closed = True
+
+class TestImportTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.cnn = QueryCounter(FakeConnection())
+        self.timings = ImportTimings()
+
+    def testQueryCounter(self):
+        self.cnn.query("SELECT 1")
+        self.cnn.query("SELECT 2")
+        self.assertEquals(2, self.cnn.count)
+        self.assertEquals(["SELECT 1", "SELECT 2"], self.cnn.cnn.queries)
+        # everything else goes to the real connection
+        self.cnn.close()
+        self.assertTrue(self.cnn.cnn.closed)
+
+    def testStartStop(self):
+        started = self.timings.start("parse")
+        self.timings.stop(started, rows = 88)
+        self.timings.counter = self.cnn
+        started = self.timings.start("insert")
+        self.cnn.query("INSERT 1")
+        self.cnn.query("INSERT 2")
+        self.timings.stop(started, rows = 10)
+        self.timings.add("cleo atmo", 60.0)
+
+        phases = [(p["phase"], p["rows"], p["queries"]) \
+            for p in self.timings.phases]
+        self.assertEquals([("parse", 88, None), ("insert", 10, 2)
+                         , ("cleo atmo", None, None)], phases)
+        self.assertTrue(self.timings.total() >= 60.0)
+        self.assertEquals(2, self.timings.queries())
+
+    def testWrite(self):
+        self.timings.add("cleo atmo", 60.0)
+        self.timings.add("insert forecasts", 0.5, 88, 2)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.timings.write(path, datetime(2010, 6, 4, 18)
+                               , datetime(2010, 6, 4, 18, 40))
+        timings = json.load(open(path))
+        os.remove(path)
+
+        self.assertEquals("2010-06-04 18:00:00", timings["forecast_time"])
+        self.assertEquals(60.5, timings["total_seconds"])
+        self.assertEquals(2, len(timings["phases"]))
+        self.assertEquals(88, timings["phases"][1]["rows"])
+
+    def testInsert(self):
+        self.timings.add("cleo atmo", 60.0)
+        self.timings.add("insert forecasts", 0.5, 88, 2)
+        self.timings.insert(self.cnn, 3, 4)
+
+        self.assertEquals(1, self.cnn.count)
+        q = self.cnn.cnn.queries[0]
+        self.assertTrue("INTO import_timings" in q)
+        self.assertTrue("(4, 3, 'cleo atmo', 60.000000, NULL, NULL)" in q)
+        self.assertTrue("(4, 3, 'insert forecasts', 0.500000, 88, 2)" in q)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -93,3 +93,18 @@ class PyrgeometerData(SamplerData):
         mjd, di = self.getDownwardIrradiance(dates)
 
         return numpy.median(di)
+
+    def getHourlyMedianDownwardIrradiance(self, start, end, centered = True):
+        """
+        Returns each hour from start up to (but not including) end, and
+        the median downward irradiance (W/m^2) of the hour centered on it
+        (or, if not centered, of the hour up to it); NaN where there's
+        no data.
+        """
+        dts, _, _, medians = self.GetRollingStats(start
+                                                , end
+                                                , timedelta(hours = 1)
+                                                , timedelta(hours = 1)
+                                                , self.getDownwardIrradiance
+                                                , centered)
+        return dts, medians[:, 0]
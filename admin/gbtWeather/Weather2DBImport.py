@@ -42,6 +42,8 @@ class Weather2DBImport:
                                     )
         self.weatherData = WeatherData()
         self.pyrgeometerData = PyrgeometerData()
+        # (the sampler cache is shared, so this covers both)
+        self.weatherData.SetCacheDirectory(settings.SAMPLER_CACHE_DIR)
 
     def getNeededWeatherDates(self, dt = None):
         """
@@ -109,19 +111,62 @@ class Weather2DBImport:
         # look for any missing data within the last year
         end   = datetime.utcnow()
         start = end - timedelta(days = 365)
-        dts = self.getNeededWeatherDatesInRange(start, end)
+        dts = self.parseDates(self.getNeededWeatherDatesInRange(start, end))
+        winds = self.getDanaMedianSpeeds([dt for _, dt in dts])
+        irradiances = self.getMedianDownwardIrradiances(winds.keys())
 
-        for dtId, dtStr in dts:
-            dt = datetime.strptime(dtStr, "%Y-%m-%d %H:%M:%S")
-            try:
-                wind = self.weatherData.getHourDanaMedianSpeeds(dt)
-            except:
+        for dtId, dt in dts:
+            wind = winds.get(dt)
+            if wind is None:
                 continue
-            di   = self.pyrgeometerData.getHourMedianDownwardIrradiance(dt)
+            di   = irradiances[dt]
             results.append((dtId, wind, di))
             self.insert(dtId, wind, di)
         return results    
 
+    def parseDates(self, dts):
+        return [(dtId, datetime.strptime(dtStr, "%Y-%m-%d %H:%M:%S"))
+                for dtId, dtStr in dts]
+
+    def getRuns(self, dts):
+        "Splits the given datetimes up into runs of consecutive hours."
+        runs = []
+        for dt in sorted(set(dts)):
+            if len(runs) > 0 and dt == runs[-1][-1] + timedelta(hours = 1):
+                runs[-1].append(dt)
+            else:
+                runs.append([dt])
+        return runs
+
+    def getDanaMedianSpeeds(self, dts):
+        """
+        Returns the Dana median wind speeds for those of the given
+        datetimes we have wind data for, by datetime.  Runs of consecutive
+        hours are read from the sampler logs together.
+        """
+        winds = {}
+        for run in self.getRuns(dts):
+            hours, _, danaMedians, _, _ = self.weatherData.getHourlyWindStats( \
+                run[0], run[-1] + timedelta(hours = 1))
+            for dt, wind in zip(hours, danaMedians):
+                if wind == wind:
+                    winds[dt] = wind
+        return winds
+
+    def getMedianDownwardIrradiances(self, dts):
+        """
+        Returns the median downward irradiance for each of the given
+        datetimes (NaN where there's no data), by datetime, reading runs
+        of consecutive hours together.
+        """
+        irradiances = {}
+        for run in self.getRuns(dts):
+            hours, medians = \
+                self.pyrgeometerData.getHourlyMedianDownwardIrradiance( \
+                    run[0], run[-1] + timedelta(hours = 1))
+            irradiances.update(zip(hours, medians))
+        return irradiances
+
     def findNullValues(self, column):
         "Who is missing a value?"
         query = """
@@ -206,15 +251,16 @@ class Weather2DBImport:
         Acquires the needed data whose dates that don't have any
         accompanying weather data, and inserts it into the database.
         """
-        dts = self.getNeededWeatherDatesInRange(starttime, endtime)
-        for dtId, dtStr in dts:
-            dt = datetime.strptime(dtStr, "%Y-%m-%d %H:%M:%S")
+        dts = self.parseDates(self.getNeededWeatherDatesInRange(starttime
+                                                              , endtime))
+        winds = self.getDanaMedianSpeeds([dt for _, dt in dts])
+        irradiances = self.getMedianDownwardIrradiances(winds.keys())
+        for dtId, dt in dts:
             # Is there wind data?
-            try:
-                wind = self.weatherData.getHourDanaMedianSpeeds(dt)
-            except:
+            wind = winds.get(dt)
+            if wind is None:
                 continue
-            di = self.pyrgeometerData.getHourMedianDownwardIrradiance(dt)
+            di = irradiances[dt]
             # Is irradiance a NaN?
             if di != di:
                 di = None
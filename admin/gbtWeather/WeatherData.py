@@ -21,6 +21,8 @@
 #       Green Bank, WV 24944-0002 USA
 
 from   utilities.SamplerData     import SamplerData
+from   utilities.RollingStats    import RollingStats
+from   utilities.SamplerLogFollower import SamplerLogFollower
 from   mx              import DateTime
 import numpy
 from datetime import datetime, timedelta
@@ -32,6 +34,14 @@ Y1 = 1
 Y2 = 2
 MJD2DATETIME = (2400000.5 - 1721424.5)
 
+# how many hours getHourlyWindStats reads from the logs at once
+HOURSPERREAD = 24
+
+# the Dana median is of the medians of steps of this many samples ...
+DANASTEPSIZE = 20
+# ... taking the one this fraction of the way from the top
+DANAFRACTION = 0.1
+
 class WeatherData(SamplerData):
 
     """
@@ -62,6 +72,21 @@ class WeatherData(SamplerData):
         """
         return self.getWindData(dates, (0,1), ('X','Y1'))
 
+    def followWindVelocity(self, span = timedelta(hours = 1)):
+        """
+        Returns a SamplerLogFollower of the wind velocities (m/s): each
+        poll of it reads just what's been logged since the last, and its
+        getData returns the timestamps and velocities of the last span
+        of them.  E.g., for the median of the last hour, every minute:
+            follower = wd.followWindVelocity()
+            while True:
+                follower.poll()
+                mjd, wind = follower.getData()
+                print numpy.median(wind)
+                time.sleep(60)
+        """
+        return SamplerLogFollower(self, (1,), span)
+
     def getLastHourMedianWindSpeeds(self, now = None):
 
         if now is None:
@@ -92,23 +117,99 @@ class WeatherData(SamplerData):
 
         return self.danaMedian(wind)
 
+    def getHourlyWindStats(self, start, end, centered = True):
+        """
+        Returns, for each hour from start up to (but not including) end,
+        the hours, and the median, Dana median, maximum and number of the
+        wind speeds (m/s) in the hour centered on each (or, if not
+        centered, the hour up to each).  Statistics we don't have
+        enough data for are NaN.
+        Rather than reading the logs an hour at a time, they are read a
+        day at a time, and split up into hours by bisection.
+        """
+
+        hours = []
+        dt = start
+        while dt < end:
+            hours.append(dt)
+            dt += timedelta(hours = 1)
+
+        medians     = self.nans(len(hours))
+        danaMedians = self.nans(len(hours))
+        maxs        = self.nans(len(hours))
+        counts      = numpy.zeros(len(hours), dtype = int)
+
+        before = timedelta(minutes = 30) if centered else timedelta(hours = 1)
+        for first in range(0, len(hours), HOURSPERREAD):
+            starts = [dt - before for dt in hours[first:first + HOURSPERREAD]]
+            ends   = [dt + timedelta(hours = 1) for dt in starts]
+            dates  = (starts[0].utctimetuple()[:6], ends[-1].utctimetuple()[:6])
+            mjd, wind = self.getWindVelocity(dates)
+            if numpy.any(mjd[1:] < mjd[:-1]):
+                order = numpy.argsort(mjd, kind = 'mergesort')
+                mjd, wind = mjd[order], wind[order]
+
+            # like GetPlotData, each hour includes both its ends
+            startMJDs = self.DatetimesToMJDs(starts)
+            endMJDs   = self.DatetimesToMJDs(ends)
+            stats = RollingStats(mjd, wind)
+            los, his = stats.getRows(startMJDs, endMJDs)
+            rows = slice(first, first + len(starts))
+            danaMedians[rows] = self.danaMedians(wind, los, his)
+            counts[rows], maxs[rows], table = stats.getStats(startMJDs, endMJDs)
+            medians[rows] = table[:, 0]
+
+        return hours, medians, danaMedians, maxs, counts
+
+    def nans(self, length):
+        array = numpy.empty(length)
+        array.fill(numpy.nan)
+        return array
+
     def danaMedian(self, data):
         """
         Compute Dana Balser's (@Registered Trademark) special median.
         See DSPN6.1.  Data is assumed to be at 1 Hz.
         """
 
-        stepSize = 20
-        fraction = 0.1 # get the 90% highest median
-        length = len(data)
-        steps = length / stepSize
-        targetIndex = int(steps - (fraction * steps))
-        stepMedians = []
-        for i in range(steps):
-            start = i*stepSize
-            stop = start + stepSize
-            stepData = data[start:stop]
-            stepMedians.append(numpy.median(stepData))
-        stepMedians.sort()
-        return stepMedians[targetIndex]
+        data = numpy.asarray(data, dtype = float)
+        steps = len(data) / DANASTEPSIZE
+        if steps == 0:
+            raise IndexError("less than one step of data")
+        targetIndex = int(steps - (DANAFRACTION * steps))
+        stepData = data[:steps * DANASTEPSIZE].reshape(steps, DANASTEPSIZE)
+        stepMedians = numpy.median(stepData, axis = 1)
+        return numpy.partition(stepMedians, targetIndex)[targetIndex]
+
+    def danaMedians(self, data, los, his):
+        """
+        The Dana medians of many hours at once: of data[los[i]:his[i]] for
+        each i, or NaN where that's less than one step of data.
+        The medians of the steps of all the hours are found together, then
+        sorted in an (hour x step) table, so there's no looping over hours.
+        """
 
+        data  = numpy.asarray(data, dtype = float)
+        los   = numpy.asarray(los, dtype = int)
+        steps = numpy.maximum(numpy.asarray(his, dtype = int) - los, 0) \
+                / DANASTEPSIZE
+        result = self.nans(len(steps))
+        if steps.sum() == 0:
+            return result
+
+        # the hour of each step, and where it starts in data
+        hour   = numpy.repeat(numpy.arange(len(steps)), steps)
+        step   = numpy.arange(len(hour)) - (numpy.cumsum(steps) - steps)[hour]
+        starts = los[hour] + step * DANASTEPSIZE
+        stepData = data[starts[:, numpy.newaxis] + numpy.arange(DANASTEPSIZE)]
+
+        # sort each hour's medians (padded out with NaN, which sorts
+        # last, so an hour's own NaNs end up just where danaMedian's
+        # partition puts them), and pick out each one's target
+        stepMedians = self.nans((len(steps), steps.max()))
+        stepMedians[hour, step] = numpy.median(stepData, axis = 1)
+        stepMedians.sort(axis = 1)
+        has = numpy.nonzero(steps)[0]
+        targetIndex = (steps - (DANAFRACTION * steps)).astype(int)
+        result[has] = stepMedians[has, targetIndex[has]]
+        return result
@@ -22,6 +22,7 @@
 
 from datetime    import datetime, timedelta
 from WeatherData import WeatherData
+from utilities.DateRegistry import DateRegistry
 import pg
 
 class WeatherStation2DBImport:
@@ -33,6 +34,7 @@ class WeatherStation2DBImport:
         self.c           = pg.connect(user = "dss"
                                     , dbname = dbname)
         self.weatherData = WeatherData()
+        self.weatherDates = DateRegistry(self.c, "weather_dates")
 
     def getWind(self, dt):
         """
@@ -59,16 +61,14 @@ class WeatherStation2DBImport:
         return [self.getWind(row['date']) for row in r.dictresult()]
 
     def getWeatherDate(self, dt):
-        r = \
-            self.c.query("SELECT id FROM weather_dates WHERE date = '%s'" % dt)
-        if len(r.dictresult()) == 0:
-            self.c.query("INSERT INTO weather_dates (date) VALUES ('%s')" % dt)
-            r = \
-                self.c.query("SELECT id FROM weather_dates WHERE date = '%s'" % dt)
-        return r.dictresult()[0]["id"]
+        return self.weatherDates.get(dt)
 
     def insert(self):
-        for dt, wind_speed in self.getWindSpeeds():
+        winds = self.getWindSpeeds()
+        if len(winds) > 0:
+            dts = [dt for dt, _ in winds]
+            self.weatherDates.preload(min(dts), max(dts))
+        for dt, wind_speed in winds:
             wd_id = self.getWeatherDate(dt)
             # Handle if no weather station wind speed measure was taken
             if str(wind_speed) == 'nan':
@@ -24,6 +24,7 @@ import sys
 from datetime    import datetime, timedelta
 from TimeAgent   import dt2mjd
 from WeatherData import WeatherData
+import settings
 
 # Reads measured winds from the telescope logs
 #
@@ -42,6 +43,7 @@ class WeatherStation2Text:
     def __init__(self, year):
         self.dtFormat = "%Y-%m-%d %H:%M:%S"
         self.weatherData = WeatherData()
+        self.weatherData.SetCacheDirectory(settings.SAMPLER_CACHE_DIR)
         self.start = datetime(year, 1, 1, 0, 0, 0)
         self.end = self.start + timedelta(hours = 24*365)
 
@@ -53,14 +55,13 @@ class WeatherStation2Text:
         return dt, self.weatherData.getLastHourMedianWindSpeeds(dt)
 
     def getWinds(self, hours):
-        retval = []
-        for h in range(hours):
-            dt = self.start + timedelta(hours = h)
-            try:
-                retval.append(self.getWind(dt))
-            except:
-                pass
-        return retval
+        """
+        The median wind speed of the hour up to each of the given hours;
+        NaN for hours without any.
+        """
+        dts, medians, _, _, _ = self.weatherData.getHourlyWindStats( \
+            self.start, self.start + timedelta(hours = hours), centered = False)
+        return zip(dts, medians)
 
     def print_winds(self, data):
         print "MJD Measured"
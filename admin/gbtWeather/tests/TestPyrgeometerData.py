@@ -68,6 +68,13 @@ class TestWeatherData(unittest.TestCase):
             d = self.pd.getHourMedianDownwardIrradiance(dt)
             self.assertAlmostEqual(exp[i], d)
 
+        # all at once
+        dts, ds = self.pd.getHourlyMedianDownwardIrradiance(start
+                                    , start + timedelta(hours = 24))
+        self.assertEqual(start + timedelta(hours = 23), dts[-1])
+        for i in range(24):
+            self.assertAlmostEqual(exp[i], ds[i])
+
 
     
 if __name__ == "__main__":
@@ -77,6 +77,27 @@ class TestWeatherData(unittest.TestCase):
         m = self.wd.getHourDanaMedianSpeeds(dt)
         self.assertAlmostEquals(0.52738451957702637, m, 4)
 
+    def testGetHourlyWindStats(self):
+
+        start = datetime(2010, 6, 7, 11) # UTC
+        hours, medians, danaMedians, maxs, counts = \
+            self.wd.getHourlyWindStats(start, start + timedelta(hours = 3))
+        self.assertEqual([start + timedelta(hours = h) for h in range(3)]
+                       , hours)
+        self.assertAlmostEquals(3.74649739265, danaMedians[1], 4)
+        for i, dt in enumerate(hours):
+            m = self.wd.getHourDanaMedianSpeeds(dt)
+            self.assertAlmostEquals(m, danaMedians[i], 4)
+            self.assertTrue(counts[i] > 0)
+            self.assertTrue(medians[i] <= maxs[i])
+
+        # the hours up to each
+        start = datetime(2007, 11, 29, 22)
+        hours, medians, danaMedians, maxs, counts = \
+            self.wd.getHourlyWindStats(start, start + timedelta(hours = 3)
+                                     , centered = False)
+        self.assertAlmostEquals(2.38246560, medians[2], 4)
+
     def testDanaMedian(self):
 
         # simple tests first
@@ -91,6 +112,43 @@ class TestWeatherData(unittest.TestCase):
         data = [float(i) for i in range(3600)]
         m = self.wd.danaMedian(data)
         self.assertEqual(3249.5, m)
-    
+
+        self.assertRaises(IndexError, self.wd.danaMedian, [1.0] * 19)
+
+    def testDanaMedians(self):
+
+        data = [float(i) for i in range(3600)] + [1.0 for i in range(110)]
+        ms = self.wd.danaMedians(data, [0, 3600, 0, 3700], [3600, 3710, 0, 3710])
+        self.assertEqual(3249.5, ms[0])
+        self.assertEqual(1.0, ms[1])
+        # not enough data
+        self.assertTrue(ms[2] != ms[2])
+        self.assertTrue(ms[3] != ms[3])
+
+        # same as one at a time
+        data = [float((i * 7919) % 1000) for i in range(5000)]
+        los = [0, 13, 1200, 2500]
+        his = [3600, 2000, 1300, 5000]
+        ms = self.wd.danaMedians(data, los, his)
+        for m, lo, hi in zip(ms, los, his):
+            self.assertEqual(self.wd.danaMedian(data[lo:hi]), m)
+
+    def testDanaMediansNaN(self):
+
+        # hours of different lengths, with NaNs in some of their steps
+        nan = float('nan')
+        data = [nan] * 200 + [1.0] * 3600 + [nan] * 200 + [2.0] * 3400
+        los = [0, 200, 0, 3800, 100, 3700]
+        his = [200, 3800, 3800, 7400, 2000, 4100]
+        ms = self.wd.danaMedians(data, los, his)
+        for m, lo, hi in zip(ms, los, his):
+            exp = self.wd.danaMedian(data[lo:hi])
+            self.assertTrue(exp == m or (exp != exp and m != m)
+                          , "%s != %s for [%d:%d]" % (exp, m, lo, hi))
+        # NaN, not inf, when too many steps are NaN
+        self.assertTrue(ms[0] != ms[0])
+        self.assertTrue(ms[5] != ms[5])
+        self.assertEqual([1.0, 1.0, 2.0, 1.0], list(ms[1:5]))
+
 if __name__ == "__main__":
     unittest.main()
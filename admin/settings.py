@@ -21,3 +21,7 @@
 #       Green Bank, WV 24944-0002 USA
 
 DATABASE_PORT = 5432
+
+# where SamplerData keeps decoded sampler log columns between runs
+# (e.g., "/home/dss/samplerCache"); None to always decode the logs
+SAMPLER_CACHE_DIR = None
@@ -0,0 +1,108 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+class DateRegistry:
+
+    """
+    Maps dates to IDs for one of the weather database's date tables,
+    i.e., weather_dates, forecast_times or import_times, so that the
+    importers don't each have to do a select-insert-select per hour.
+    A range of dates can be preloaded with one query; after that, dates
+    in that range are served from memory, and any missing dates are
+    created in bulk with a single insert.
+    Dates are keyed by their string representation, which is also how
+    the DB hands them back to us ('%Y-%m-%d %H:%M:%S').
+    """
+
+    def __init__(self, cnn, table = "weather_dates"):
+        self.cnn   = cnn
+        self.table = table
+        self.ids   = {}
+        # ranges of dates for which self.ids is known to be complete
+        self.ranges = []
+
+    def key(self, dt):
+        return str(dt)
+
+    def preload(self, start, end):
+        "Reads all the dates between start and end (inclusive) at once."
+        start, end = self.key(start), self.key(end)
+        r = self.cnn.query("""
+                           SELECT id, date
+                           FROM %s
+                           WHERE date >= '%s' AND date <= '%s'
+                           """ % (self.table, start, end))
+        self.ids.update([(self.key(row['date']), row['id']) \
+            for row in r.dictresult()])
+        self.ranges.append((start, end))
+
+    def isPreloaded(self, key):
+        for start, end in self.ranges:
+            if start <= key <= end:
+                return True
+        return False
+
+    def lookup(self, keys):
+        "Goes to the DB once for all the keys we can't answer from memory."
+        unknown = [k for k in set(keys) \
+            if not self.ids.has_key(k) and not self.isPreloaded(k)]
+        if len(unknown) == 0:
+            return
+        dates = ", ".join(["'%s'" % k for k in unknown])
+        r = self.cnn.query("SELECT id, date FROM %s WHERE date IN (%s)" % \
+            (self.table, dates))
+        self.ids.update([(self.key(row['date']), row['id']) \
+            for row in r.dictresult()])
+
+    def find(self, dt):
+        "Returns the ID of the given date, or None if it isn't in the DB."
+        key = self.key(dt)
+        self.lookup([key])
+        return self.ids.get(key)
+
+    def get(self, dt):
+        "Returns the ID of the given date, creating it if need be."
+        return self.getIds([dt])[0]
+
+    def getIds(self, dts):
+        """
+        Returns the IDs of all the given dates, in order, creating the
+        ones that don't exist yet with a single insert.
+        """
+        keys = [self.key(dt) for dt in dts]
+        self.lookup(keys)
+
+        missing = []
+        for k in keys:
+            if not self.ids.has_key(k) and k not in missing:
+                missing.append(k)
+        if len(missing) > 0:
+            values = ", ".join(["('%s')" % k for k in missing])
+            r = self.cnn.query("""
+                               INSERT INTO %s (date)
+                               VALUES %s
+                               RETURNING id, date
+                               """ % (self.table, values))
+            self.ids.update([(self.key(row['date']), row['id']) \
+                for row in r.dictresult()])
+
+        return [self.ids[k] for k in keys]
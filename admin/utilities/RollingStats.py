@@ -0,0 +1,139 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from bisect import bisect_left, insort
+import numpy
+
+# keeping a sorted window up to date costs about this many times as much
+# per sample added or dropped as numpy spends per sample finding a
+# percentile from scratch
+INCREMENTALCOST = 40
+
+class RollingStats:
+
+    """
+    Statistics (number, maximum and percentiles, such as the median) of
+    a time series - e.g., the X and Y1 of SamplerData.GetPlotData - over
+    windows sliding along it, in one pass.
+    Where the windows overlap almost entirely (small steps), a sorted
+    copy of the current window is kept, and only the samples that come
+    into and drop out of it are inserted and removed; otherwise (e.g.
+    hour long windows an hour apart) numpy finds each window's
+    percentiles from scratch, which is faster.  Either way the results
+    are the same as numpy.percentile's (numpy.median's for the 50th),
+    in the dtype of the values.
+    """
+
+    def __init__(self, times, values):
+        "times must be in order."
+        self.times  = numpy.asarray(times)
+        self.values = numpy.asarray(values)
+        if self.values.dtype.kind == 'f':
+            self.dtype = self.values.dtype
+        else:
+            self.dtype = numpy.dtype(float)
+        # how many NaNs come before each sample
+        self.nans = numpy.concatenate(([0]
+                                     , numpy.cumsum(numpy.isnan(self.values))))
+
+    def getRows(self, starts, ends):
+        "The rows of the samples with starts[i] <= time <= ends[i]."
+        los = numpy.searchsorted(self.times, starts, side = 'left')
+        his = numpy.searchsorted(self.times, ends, side = 'right')
+        return los, numpy.maximum(los, his)
+
+    def getStats(self, starts, ends, percentiles = (50.0,)):
+        """
+        For each window of samples with starts[i] <= time <= ends[i],
+        returns how many there are, their maximum, and a (window x
+        percentile) table of the given percentiles of them.  The
+        statistics of windows that are empty, or contain NaNs, are NaN.
+        Windows can be in any order, but are fastest sliding forward.
+        """
+        los, his = self.getRows(starts, ends)
+        n = len(los)
+        counts = his - los
+        maxs  = numpy.empty(n, dtype = self.dtype)
+        table = numpy.empty((n, len(percentiles)), dtype = self.dtype)
+        maxs.fill(numpy.nan)
+        table.fill(numpy.nan)
+
+        # keep a sorted window for the next one to slide from?
+        steps = numpy.abs(numpy.diff(los)) + numpy.abs(numpy.diff(his))
+        keep = numpy.concatenate((steps * INCREMENTALCOST < counts[:-1]
+                                , [False]))
+
+        values = self.values.tolist()
+        window = None
+        lo = hi = 0
+        for i in range(n):
+            l, h = los[i], his[i]
+            if h == l:
+                continue
+            if window is not None and lo <= l <= hi <= h:
+                for v in values[hi:h]:
+                    if v == v:
+                        insort(window, v)
+                for v in values[lo:l]:
+                    if v == v:
+                        del window[bisect_left(window, v)]
+            elif keep[i]:
+                window = sorted([v for v in values[l:h] if v == v])
+            else:
+                window = None
+            lo, hi = l, h
+
+            if self.nans[h] - self.nans[l] == 0:
+                if window is None:
+                    # all we need is the samples at these ranks in order
+                    ranks = [h - l - 1]
+                    for p in percentiles:
+                        ranks.extend(self.getRanks(h - l, p)[:2])
+                    ordered = numpy.partition(self.values[l:h], sorted(set(ranks)))
+                else:
+                    ordered = window
+                maxs[i]  = ordered[h - l - 1]
+                table[i] = [self.percentile(ordered, h - l, p)
+                            for p in percentiles]
+            if not keep[i]:
+                window = None
+
+        return counts, maxs, table
+
+    def getRanks(self, length, p):
+        """
+        The ranks of the samples that the p'th percentile of length of them
+        is between, and how far it is from the first to the second.
+        """
+        rank = (p / 100.0) * (length - 1)
+        below = int(rank)
+        above = min(below + 1, length - 1)
+        return below, above, rank - below
+
+    def percentile(self, ordered, length, p):
+        """
+        As numpy.percentile does it, given samples that are in order at
+        (at least) the ranks the percentile needs.
+        """
+        below, above, weight = self.getRanks(length, p)
+        return float(ordered[below]) * (1.0 - weight) \
+             + float(ordered[above]) * weight
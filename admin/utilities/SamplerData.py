@@ -25,11 +25,14 @@
 from   mx                   import DateTime
 import numpy
 import pyfits
-import dircache
 import glob
 import string
 import sys
 import pickle
+from   SamplerLogIndex      import SamplerLogIndex
+from   SamplerLogCache      import SamplerLogCache
+from   RollingStats         import RollingStats
+from   datetime             import timedelta
 
 # set some variables
 X  = 0
@@ -37,11 +40,29 @@ Y1 = 1
 Y2 = 2
 MJD2DATETIME = (2400000.5 - 1721424.5)
 
+# how much data GetRollingStats reads from the logs at once
+READSPAN = timedelta(days = 1)
+
+# shared by all SamplerData, so the log directories are only read again
+# when they change
+LOGINDEX = SamplerLogIndex()
+
+# likewise, so a log read an hour at a time is only decoded once;
+# set LOGCACHE.maxBytes to change how much it holds
+LOGCACHE = SamplerLogCache()
+
 class SamplerData:
 
-    def __init__(self, samplerName, debug=0):
+    def __init__(self, samplerName, debug=0, memmap=True, cache=True):
 
         self.debug = debug
+
+        # memory map the logs, and only read the rows we're after?
+        # (this relies on the logs being in time order)
+        self.memmap = memmap
+
+        # keep the columns we read from finished logs in LOGCACHE?
+        self.cache = LOGCACHE if cache else None
         
         self.exprTxt = ['X','Y1', 'Y2']
         self.columnNames = []
@@ -89,43 +110,149 @@ class SamplerData:
          
         logKeys = self.GetLogFilesInRange(startDateTime, endDateTime)
 
-        i = 0
+        # the rows in range from each file, for X, Y1 and Y2
+        pieces = [[], [], []]
 
-        numKeys = len(logKeys)
-        
         for k in logKeys:
             f = self.logFiles[k]
-            i += 1
 
-            #msg = "\rReading Files: %d of %d" % (i, numKeys)
-            #print msg,
-            #sys.stdout.flush()
+            # a log still being written would be read whole again each
+            # time it changed, so only finished ones are worth caching
+            if self.cache is not None and self.cache.isStable(f):
+                cols = self.cache.getColumns(f, [0] + list(columns))
+                if self.memmap:
+                    rows = self.FindRows(cols[0], startMJD, endMJD)
+                else:
+                    rows = self.SelectRows(cols[0], startMJD, endMJD)
+                for id, col in enumerate(cols[1:]):
+                    pieces[id].append(col[rows])
+                continue
 
             # Note: we aren't worried about compressed files, since the
             # DSS should be reading recent sampler data.
-            hdulist = pyfits.open(f)
+            hdulist = pyfits.open(f, memmap = self.memmap)
             hdudata = hdulist[1].data
-            numRows = hdudata.size
-            dmjds = hdudata.field(0)
-            columnData = [ [], [], [] ]
-            for i, colNo in enumerate(columns):
-                columnData[i].extend( hdudata.field(columns[i]) )
-            # Note: we could do this better by using a query in the collection
-            # of the data (see Pyfits manual)
-            for rowNo in range(numRows):
-                dmjd = dmjds[rowNo]
-                if dmjd < startMJD or endMJD < dmjd: continue
-                for id in range(len(columns)):
-                    value = columnData[id][rowNo] 
-                    data[id].append(value)
+            if self.memmap:
+                rows = self.FindRows(hdudata.field(0), startMJD, endMJD)
+            else:
+                rows = self.SelectRows(hdudata.field(0), startMJD, endMJD)
+            # copy out just these rows of just these columns
+            for id, colNo in enumerate(columns):
+                pieces[id].append(numpy.array(hdudata.field(colNo)[rows]))
             hdulist.close()
 
-        d2 = [numpy.array(d) for d in data]
-        for d in d2:
-            d.shape = (len(d),)
+        d2 = [numpy.concatenate(p) if len(p) > 0 else numpy.array([]) \
+            for p in pieces]
 
         return self.EvaluateExpr(d2, columns)
 
+    def SelectRows(self, dmjds, startMJD, endMJD):
+        """
+        Returns what picks out the rows with startMJD <= dmjd <= endMJD:
+        a slice, found by bisection, since the log is in time order -
+        or a mask if it turns out not to be.
+        """
+        dmjds = numpy.asarray(dmjds)
+        if numpy.all(dmjds[1:] >= dmjds[:-1]):
+            lo = numpy.searchsorted(dmjds, startMJD, side = 'left')
+            hi = numpy.searchsorted(dmjds, endMJD, side = 'right')
+            return slice(lo, hi)
+        return (startMJD <= dmjds) & (dmjds <= endMJD)
+
+    def FindRows(self, dmjds, startMJD, endMJD):
+        """
+        Like SelectRows, but for a memory mapped log: the bounds are
+        found with a binary search that looks at only a few dozen values,
+        so only those pages of the file (and then the ones of the rows
+        in range) are ever read.  That relies on the log being in time
+        order, so the rows found, and their neighbours, are checked for
+        it; if they aren't, we fall back to SelectRows' mask.  (Rows out
+        of order well away from those found go unnoticed.)
+        """
+        def bisect(before):
+            lo, hi = 0, len(dmjds)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if before(dmjds[mid]):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+        lo = bisect(lambda dmjd: dmjd < startMJD)
+        hi = bisect(lambda dmjd: dmjd <= endMJD)
+        if self.InOrder(dmjds, lo, hi):
+            return slice(lo, hi)
+        return self.SelectRows(dmjds, startMJD, endMJD)
+
+    def InOrder(self, dmjds, lo, hi):
+        """
+        Does the log look to be in time order around the rows [lo, hi)
+        that FindRows found?  Only those rows (which get read anyway), a
+        couple either side of them, and the first and last are looked at.
+        """
+        n = len(dmjds)
+        if n > 0 and dmjds[0] > dmjds[n - 1]:
+            return False
+        # (max and min are numpy's here)
+        first = lo - 2 if lo > 2 else 0
+        last = (lo if lo > hi else hi) + 2
+        rows = numpy.asarray(dmjds[first:last])
+        return bool(numpy.all(rows[1:] >= rows[:-1]))
+
+    def GetRollingStats(self, start, end, step, width, getData
+                      , centered = True, percentiles = (50.0,)):
+        """
+        Statistics of a series over a window sliding along it: for each
+        datetime from start up to (but not including) end, every step
+        apart, those of the samples in the window (width long) centered
+        on it, or, if not centered, up to it.  getData is what gets the
+        series, given dates as for GetPlotData (e.g.,
+        WeatherData.getWindVelocity).
+        Returns the datetimes, and (see RollingStats.getStats) the number
+        and maximum of the samples in each window, and a (datetime x
+        percentile) table of the given percentiles of them.
+        The logs are read a day or so at a time.
+        """
+
+        dts = []
+        dt = start
+        while dt < end:
+            dts.append(dt)
+            dt += step
+        before = width / 2 if centered else width
+        after  = width - before
+
+        counts = numpy.zeros(len(dts), dtype = int)
+        maxs   = numpy.empty(len(dts))
+        table  = numpy.empty((len(dts), len(percentiles)))
+
+        first = 0
+        while first < len(dts):
+            last = first + 1
+            while last < len(dts) and dts[last] - dts[first] < READSPAN:
+                last += 1
+            starts = [dt - before for dt in dts[first:last]]
+            ends   = [dt + after for dt in dts[first:last]]
+            dates  = (starts[0].utctimetuple()[:6], ends[-1].utctimetuple()[:6])
+            xs, ys = getData(dates)
+            if numpy.any(xs[1:] < xs[:-1]):
+                order = numpy.argsort(xs, kind = 'mergesort')
+                xs, ys = xs[order], ys[order]
+
+            # like GetPlotData, each window includes both its ends
+            stats = RollingStats(xs, ys).getStats(self.DatetimesToMJDs(starts)
+                                                , self.DatetimesToMJDs(ends)
+                                                , percentiles)
+            counts[first:last], maxs[first:last], table[first:last] = stats
+            first = last
+
+        return dts, counts, maxs, table
+
+    def DatetimesToMJDs(self, dts):
+        "The MJDs of the given datetimes, as GetPlotData computes them."
+        return numpy.array([DateTime.DateTime(*dt.utctimetuple()[:6]).mjd
+                            for dt in dts])
+
     def EvaluateExpr(self, data, columns):
         exprDict = globals()
         exprDict.update(numpy.__dict__)
@@ -157,17 +284,12 @@ class SamplerData:
         "Returns a list of paths to all the log files between the two times for the currently selected sampler."
         startText = startDateTime.Format("%Y_%m_%d_%H:%M:%S")
         endText   = endDateTime.Format("%Y_%m_%d_%H:%M:%S")
+
+        # pick up any new logs
+        self.logKeys, self.logFiles = self.GetAllLogFiles()
         
         length = len(self.logKeys)
-        startIdx = 0
-        while startIdx < length and \
-              self.logKeys[startIdx] < startText:
-            startIdx = startIdx + 1
-        startIdx = self.GetMax(0, startIdx - 1)
-        endIdx   = startIdx
-        while endIdx   < length and \
-              self.logKeys[endIdx] < endText:
-            endIdx   = endIdx   + 1
+        startIdx, endIdx = LOGINDEX.getRange(self.logKeys, startText, endText)
         endIdxM1 = self.GetMin(length - 1, endIdx)
         if length - 1 < endIdx + 1:
             endIdx = length - 1
@@ -223,16 +345,7 @@ class SamplerData:
 
     def GetAllLogFiles(self):
         "Returns a list of paths to all the files for the currently selected sampler."
-        paths = { }
-        
-        for dir in self.GetLogDirectories():
-            files = dircache.listdir(dir)
-            for f in files:
-                paths[f] = dir + '/' + f
-        keys = paths.keys()
-        keys = [k for k in keys if k.find(".fits") >= 0]
-        keys.sort()
-        return keys, paths
+        return LOGINDEX.getLogFiles(self.GetLogDirectories())
 
     def GetLogDirectories(self):
         "Returns a list of paths to all the directories holding the currently selected sampler."
@@ -255,6 +368,11 @@ class SamplerData:
         self.logName = newDirectory[string.rfind(newDirectory, "/")+1:]
         self.FindDirectories(self.logName)
 
+    def SetCacheDirectory(self, cacheDir):
+        "Also keep the columns we read on disk, in cacheDir (shared by all SamplerData)."
+        if self.cache is not None:
+            self.cache.dir = cacheDir
+
     def GetLogFileName(self, logFilePath):
         "Given a full path to a log file, returns the name to the log file."
         return logFilePath[string.rfind(logFilePath, "/")+1:]
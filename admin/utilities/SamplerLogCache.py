@@ -0,0 +1,172 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from collections import OrderedDict
+import glob
+import hashlib
+import numpy
+import os
+import pyfits
+import tempfile
+import time
+
+# a day of 1 Hz doubles is around 7 MB a column
+CACHESIZE = 256 * 1024 * 1024
+
+# logs changed more recently than this (in seconds) are probably still
+# being written, so aren't worth saving to disk
+STABLEAGE = 3600
+
+class SamplerLogCache:
+
+    """
+    Keeps the decoded columns of recently read FITS logs in memory, so
+    that reading a log an hour at a time (e.g., when backfilling) only
+    decodes it once.
+    Columns are kept by (path, column number), along with the size and
+    mtime of the log when it was read; a log that has since changed
+    (such as today's, which is still being written) is read again.  Once
+    the columns add up to more than maxBytes, the least recently used
+    are dropped.
+    Given a dir, columns are also saved there, one .npy file each, named
+    for the log's path, size and mtime; these outlive the process, and
+    are memory mapped, rather than decoded, when next needed.  Mapped
+    columns are paged in by the OS as needed, so they don't count
+    towards maxBytes.
+    """
+
+    def __init__(self, maxBytes = CACHESIZE, dir = None):
+        self.maxBytes = maxBytes
+        self.dir = dir
+        # (path, column) -> ((size, mtime), array), least recently used first
+        self.columns = OrderedDict()
+        self.nbytes = 0
+
+    def stamp(self, path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime)
+
+    def isStable(self, path):
+        "Has the log at path gone unchanged long enough to be finished?"
+        return time.time() - os.stat(path).st_mtime > STABLEAGE
+
+    def size(self, array):
+        "How much of maxBytes an array uses up."
+        return 0 if isinstance(array, numpy.memmap) else array.nbytes
+
+    def getColumns(self, path, columns):
+        "The given columns of the log at path, as arrays."
+        stamp = self.stamp(path)
+        arrays = {}
+        for colNo in columns:
+            key = (path, colNo)
+            cached = self.columns.pop(key, None)
+            if cached is None:
+                continue
+            if cached[0] == stamp:
+                # put it back as the most recently used
+                self.columns[key] = cached
+                arrays[colNo] = cached[1]
+            else:
+                self.nbytes -= self.size(cached[1])
+
+        missing = []
+        for colNo in columns:
+            if colNo not in arrays and colNo not in missing:
+                missing.append(colNo)
+        if len(missing) > 0:
+            for colNo, array in zip(missing, self.load(path, stamp, missing)):
+                arrays[colNo] = array
+                self.columns[(path, colNo)] = (stamp, array)
+                self.nbytes += self.size(array)
+            self.evict()
+
+        return [arrays[c] for c in columns]
+
+    def load(self, path, stamp, columns):
+        "The given columns from the disk cache, else from the log."
+        if self.dir is None:
+            return self.read(path, columns)
+
+        arrays = {}
+        for colNo in columns:
+            diskPath = self.diskPath(path, stamp, colNo)
+            if os.path.exists(diskPath):
+                arrays[colNo] = numpy.load(diskPath, mmap_mode = 'r')
+        missing = [c for c in columns if c not in arrays]
+        if len(missing) > 0:
+            for colNo, array in zip(missing, self.read(path, missing)):
+                arrays[colNo] = array
+                if time.time() - stamp[1] > STABLEAGE:
+                    self.save(path, stamp, colNo, array)
+        return [arrays[c] for c in columns]
+
+    def diskPath(self, path, stamp, colNo):
+        return "%s/%s_%d_%.6f_%d.npy" % (self.dir
+                                       , hashlib.sha1(path).hexdigest()
+                                       , stamp[0]
+                                       , stamp[1]
+                                       , colNo)
+
+    def save(self, path, stamp, colNo, array):
+        """
+        Writes a column to the disk cache (via a temporary file, so that
+        others never see half of one), replacing any earlier version of
+        it.  The cache is only an optimization, so failing to write it
+        isn't an error.
+        """
+        diskPath = self.diskPath(path, stamp, colNo)
+        prefix = "%s/%s_" % (self.dir, hashlib.sha1(path).hexdigest())
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir = self.dir, suffix = ".tmp")
+            f = os.fdopen(fd, "wb")
+            numpy.save(f, array)
+            f.close()
+            os.rename(tmp, diskPath)
+            for old in glob.glob(prefix + "*_%d.npy" % colNo):
+                if old != diskPath:
+                    os.remove(old)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def read(self, path, columns):
+        "Decodes the given columns of a log, in native byte order."
+        hdulist = pyfits.open(path, memmap = True)
+        hdudata = hdulist[1].data
+        arrays = []
+        for colNo in columns:
+            col = hdudata.field(colNo)
+            arrays.append(numpy.array(col, dtype = col.dtype.newbyteorder('=')))
+        hdulist.close()
+        return arrays
+
+    def evict(self):
+        "Drops the least recently used columns until we're under maxBytes."
+        while self.nbytes > self.maxBytes and len(self.columns) > 0:
+            _, (_, array) = self.columns.popitem(last = False)
+            self.nbytes -= self.size(array)
+
+    def clear(self):
+        self.columns.clear()
+        self.nbytes = 0
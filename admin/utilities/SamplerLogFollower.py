@@ -0,0 +1,120 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from   collections import deque
+from   datetime    import timedelta
+from   mx          import DateTime
+import numpy
+import pyfits
+
+class SamplerLogFollower:
+
+    """
+    Follows a sampler's logs as they are written, keeping the last span
+    (e.g., hour) of the given columns in a rolling buffer.
+    Each poll reads just the rows appended to the current log since the
+    last one - we keep an offset into it - moving on to the next log
+    once one appears.  Only the first poll looks further back, for
+    whatever of the last span is in the current and previous logs.
+    The logs are memory mapped, so rows before the offset aren't read.
+    """
+
+    def __init__(self, samplerData, columns, span = timedelta(hours = 1)):
+        self.sd      = samplerData
+        self.columns = [0] + list(columns)
+        self.span    = span.days + span.seconds / 86400.0
+        self.path    = None
+        self.row     = 0
+        # chunks of the columns, in time order
+        self.buffer  = deque()
+
+    def poll(self, now = None):
+        """
+        Reads whatever has been logged since the last poll into the
+        buffer, drops what's now more than span old, and returns how
+        many rows were read.
+        """
+        if now is None:
+            now = DateTime.gmt()
+        else:
+            now = DateTime.DateTime(*now.utctimetuple()[:6])
+        cutoff = now.mjd - self.span
+
+        keys, paths = self.sd.GetAllLogFiles()
+        if len(keys) == 0:
+            return 0
+
+        if self.path is None:
+            # start from the previous log, in case the current one is new
+            keys = keys[-2:]
+            first = True
+        else:
+            key = self.sd.GetLogFileName(self.path)
+            keys = [k for k in keys if k >= key]
+            first = False
+
+        count = 0
+        for key in keys:
+            path = paths[key]
+            if path != self.path:
+                self.path, self.row = path, 0
+            count += self.read(cutoff if first else None)
+        self.trim(cutoff)
+        return count
+
+    def read(self, startMJD = None):
+        """
+        Appends the rows of the current log from our offset on (or, given
+        startMJD, from the first at or after that) to the buffer.
+        """
+        hdulist = pyfits.open(self.path, memmap = True)
+        hdudata = hdulist[1].data
+        end = len(hdudata)
+        if startMJD is not None:
+            self.row = self.sd.FindRows(hdudata.field(0), startMJD, numpy.inf).start
+        rows = slice(self.row, end)
+        if end > self.row:
+            self.buffer.append([numpy.array(hdudata.field(c)[rows])
+                                for c in self.columns])
+        hdulist.close()
+        count = max(0, end - self.row)
+        self.row = max(self.row, end)
+        return count
+
+    def trim(self, cutoff):
+        "Drops whatever was logged before cutoff (an MJD)."
+        while len(self.buffer) > 0 and self.buffer[0][0][-1] < cutoff:
+            self.buffer.popleft()
+        if len(self.buffer) > 0:
+            first = numpy.searchsorted(self.buffer[0][0], cutoff, side = 'left')
+            if first > 0:
+                self.buffer[0] = [c[first:] for c in self.buffer[0]]
+
+    def getData(self):
+        """
+        The buffer: the MJDs of the last span's samples, then each of the
+        columns followed.
+        """
+        if len(self.buffer) == 0:
+            return [numpy.array([]) for c in self.columns]
+        return [numpy.concatenate([chunk[i] for chunk in self.buffer])
+                for i in range(len(self.columns))]
@@ -0,0 +1,95 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+from bisect import bisect_left
+import os
+
+class SamplerLogIndex:
+
+    """
+    Keeps the sorted names of the FITS logs in each sampler log
+    directory, along with the mtime of the directory when it was read.
+    A directory is only listed (and sorted) again once its mtime has
+    changed, and the merged view of a sampler's directories is only
+    rebuilt when one of them has.
+    Log names start with their start time ('2006_02_10_00:00:00.fits'),
+    so sorted names are in time order, and ranges of them can be found
+    by bisection.
+    """
+
+    def __init__(self):
+        # directory -> (mtime, sorted names)
+        self.dirs = {}
+        # directories -> (their mtimes, sorted names, name -> path)
+        self.merged = {}
+
+    def mtime(self, dir):
+        try:
+            return os.stat(dir).st_mtime
+        except OSError:
+            return None
+
+    def listdir(self, dir):
+        "The sorted names of the logs in dir."
+        mtime = self.mtime(dir)
+        cached = self.dirs.get(dir)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        names = []
+        if mtime is not None:
+            names = sorted([f for f in os.listdir(dir) if f.find(".fits") >= 0])
+        self.dirs[dir] = (mtime, names)
+        return names
+
+    def getLogFiles(self, directories):
+        """
+        The sorted log names from all the given directories, and their
+        paths; where a name is in more than one, the last directory wins.
+        """
+        directories = tuple(directories)
+        names = [self.listdir(dir) for dir in directories]
+        mtimes = tuple([self.dirs[dir][0] for dir in directories])
+        cached = self.merged.get(directories)
+        if cached is not None and cached[0] == mtimes:
+            return cached[1], cached[2]
+
+        paths = {}
+        for dir, files in zip(directories, names):
+            for f in files:
+                paths[f] = dir + '/' + f
+        if len(directories) == 1:
+            keys = list(names[0])
+        else:
+            keys = sorted(paths.keys())
+        self.merged[directories] = (mtimes, keys, paths)
+        return keys, paths
+
+    def getRange(self, keys, startText, endText):
+        """
+        Given sorted log names, the indices of the first and last logs
+        that might have data between startText and endText: the log
+        before the first one starting at startText, through to the first
+        one starting at or after endText.
+        """
+        startIdx = max(0, bisect_left(keys, startText) - 1)
+        endIdx   = max(startIdx, bisect_left(keys, endText))
+        return startIdx, endIdx
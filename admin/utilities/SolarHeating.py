@@ -23,6 +23,7 @@
 import TimeAgent
 from Sun          import Sun
 from datetime     import datetime, timedelta
+import numpy
 
 class SolarHeating:
     """
@@ -36,6 +37,7 @@ class SolarHeating:
         self.day_offset = timedelta(hours=2)
         self.night_offset = timedelta(hours=3)
         self.cache = dict()
+        self.boundsCache = dict()
 
     def isDayTime(self, dt):
         value = self.cache.get(dt)
@@ -44,7 +46,43 @@ class SolarHeating:
             self.cache[dt] = value
         return value
 
+    def isDayTimes(self, dts):
+        """
+        Vectorized isDayTime: returns a boolean array for the given
+        datetimes.  The sun is only consulted once per day, after which
+        each datetime is just compared with that day's bounds.
+        """
+        day = numpy.zeros(len(dts), dtype = bool)
+        for i, dt in enumerate(dts):
+            lastnight, today, tonight = self.getDayBounds(dt)
+            day[i] = dt < lastnight or today <= dt < tonight
+        return day
+
+    def getDayBounds(self, dt):
+        """
+        When daytime, as far as the solar heating goes, ends and
+        starts around the day of the given datetime:
+        (end of yesterday's, start of today's, end of today's).
+        """
+        key = (dt.year, dt.month, dt.day, self.day_offset, self.night_offset)
+        bounds = self.boundsCache.get(key)
+        if bounds is None:
+            bounds = self.computeDayBounds(dt)
+            self.boundsCache[key] = bounds
+        return bounds
+
     def computeDayTime(self, dt):
+        lastnight, today, tonight = self.computeDayBounds(dt)
+        if dt < lastnight:
+            return True
+        elif dt < today:
+            return False
+        elif dt < tonight:
+            return True
+        else:
+            return False
+
+    def computeDayBounds(self, dt):
         long = TimeAgent.GBTLONG
         lat = TimeAgent.rad2deg(TimeAgent.GBTLAT)
 
@@ -81,14 +119,7 @@ class SolarHeating:
         lastnight = datetime(yesterday.year, yesterday.month, yesterday.day,
                              set_hour, set_minute) + \
                              self.night_offset + set_delta
-        if dt < lastnight:
-            return True
-        elif dt < today:
-            return False
-        elif dt < tonight:
-            return True
-        else:
-            return False
+        return (lastnight, today, tonight)
 
     def getSunRiseSet(self, dt):
         "Returns the physical sun rise & set times"
@@ -3,3 +3,8 @@ from SolarHeating import SolarHeating
 from Sun import Sun
 #from TimeAgent import TimeAgent
 from emailNotifier import emailNotifier
+from DateRegistry import DateRegistry
+from SamplerLogIndex import SamplerLogIndex
+from SamplerLogCache import SamplerLogCache
+from RollingStats import RollingStats
+from SamplerLogFollower import SamplerLogFollower
@@ -0,0 +1,84 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+# 
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from datetime import datetime, timedelta
+from DateRegistry import DateRegistry
+import unittest
+import pg
+import settings
+
+class TestDateRegistry(unittest.TestCase):
+
+    # Note: these aren't "unit tests" because they interact with a DB!
+
+    def setUp(self):
+        self.cnn = pg.connect(user = "dss"
+                            , dbname = "weather_import_unit_tests"
+                            , port = settings.DATABASE_PORT)
+        self.cnn.query("TRUNCATE TABLE weather_dates CASCADE")
+        self.start = datetime(2009, 1, 1)
+        self.cnn.query("INSERT INTO weather_dates (date) VALUES ('%s')" % \
+            self.start)
+
+    def tearDown(self):
+        self.cnn.close()
+
+    def testGet(self):
+        wd = DateRegistry(self.cnn, "weather_dates")
+
+        id = wd.get(self.start)
+        self.assertEquals(id, wd.find(self.start))
+
+        # creating a date hands back the new id
+        dt = self.start + timedelta(hours = 1)
+        self.assertEquals(None, wd.find(dt))
+        newId = wd.get(dt)
+        self.assertNotEqual(id, newId)
+        r = self.cnn.query("SELECT id FROM weather_dates WHERE date = '%s'" % dt)
+        self.assertEquals(newId, r.dictresult()[0]['id'])
+
+    def testGetIds(self):
+        wd = DateRegistry(self.cnn, "weather_dates")
+        end = self.start + timedelta(hours = 23)
+        wd.preload(self.start, end)
+
+        dts = [self.start + timedelta(hours = h) for h in range(24)]
+        ids = wd.getIds(dts)
+        self.assertEquals(24, len(ids))
+        self.assertEquals(24, len(set(ids)))
+
+        # asking again doesn't create anything new
+        self.assertEquals(ids, wd.getIds(dts))
+        r = self.cnn.query("SELECT id, date FROM weather_dates ORDER BY date")
+        self.assertEquals(ids, [row['id'] for row in r.dictresult()])
+
+        # and a new registry sees the same thing
+        wd = DateRegistry(self.cnn, "weather_dates")
+        wd.preload(self.start, end)
+        self.assertEquals(ids, [wd.find(dt) for dt in dts])
+
+if __name__ == "__main__":
+    unittest.main()
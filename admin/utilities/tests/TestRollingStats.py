@@ -0,0 +1,77 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+# 
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from RollingStats import RollingStats
+import unittest
+import numpy
+
+class TestRollingStats(unittest.TestCase):
+
+    def setUp(self):
+        # one sample a second, with a NaN in the middle
+        self.times  = numpy.arange(1000.0)
+        self.values = numpy.array([float((i * 7919) % 1000) for i in range(1000)]
+                                , dtype = numpy.float32)
+        self.values[500] = numpy.nan
+
+    def check(self, starts, ends, percentiles):
+        rs = RollingStats(self.times, self.values)
+        counts, maxs, table = rs.getStats(starts, ends, percentiles)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            data = self.values[(start <= self.times) & (self.times <= end)]
+            self.assertEquals(len(data), counts[i])
+            if len(data) == 0 or numpy.isnan(data).any():
+                self.assertTrue(maxs[i] != maxs[i])
+                self.assertTrue(numpy.isnan(table[i]).all())
+                continue
+            self.assertEquals(data.max(), maxs[i])
+            self.assertEquals(numpy.median(data), table[i, 0])
+            exp = numpy.percentile(data, percentiles[1:]).astype(numpy.float32)
+            self.assertEquals(list(exp), list(table[i, 1:]))
+
+    def testSmallSteps(self):
+        # these windows are kept sorted, rather than found from scratch
+        centers = numpy.arange(-20.0, 1020.0, 1.5)
+        self.check(centers - 150, centers + 150, (50.0, 90.0, 0.0, 100.0))
+
+        # trailing
+        self.check(centers - 200, centers, (50.0, 10.0))
+
+    def testLargeSteps(self):
+        centers = numpy.arange(0.0, 1000.0, 100.0)
+        self.check(centers - 50, centers + 50, (50.0, 90.0))
+
+        # out of order, overlapping and empty
+        starts = numpy.array([900.0, 10.0, 11.0, 5000.0, 12.0, 13.0])
+        self.check(starts, starts + 200, (50.0, 33.3))
+
+    def testGetRows(self):
+        rs = RollingStats(self.times, self.values)
+        los, his = rs.getRows([10.0, 10.5, 2000.0], [20.0, 10.7, 3000.0])
+        self.assertEquals([10, 11, 1000], list(los))
+        self.assertEquals([21, 11, 1000], list(his))
+
+if __name__ == "__main__":
+    unittest.main()
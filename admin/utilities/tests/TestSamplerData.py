@@ -29,7 +29,11 @@ from datetime           import datetime, timedelta
 import unittest
 import nose
 from   mx                   import DateTime
+import numpy
 import os
+import pyfits
+import tempfile
+import shutil
 
 class TestSamplerData(unittest.TestCase):
 
@@ -48,6 +52,61 @@ class TestSamplerData(unittest.TestCase):
         self.assertEquals(3600, len(x))
         self.assertEquals(3600, len(y))
 
+    def testSelectRows(self):
+        sd = SamplerData("Weather-Weather2-weather2")
+        dmjds = numpy.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        rows = sd.SelectRows(dmjds, 2.0, 4.0)
+        self.assertEquals([2.0, 3.0, 4.0], list(dmjds[rows]))
+        self.assertEquals(0, len(dmjds[sd.SelectRows(dmjds, 6.0, 7.0)]))
+
+        # out of order rows still work
+        dmjds = numpy.array([1.0, 3.0, 2.0, 5.0, 4.0])
+        rows = sd.SelectRows(dmjds, 2.0, 4.0)
+        self.assertEquals([3.0, 2.0, 4.0], list(dmjds[rows]))
+
+    def testFindRows(self):
+        sd = SamplerData("Weather-Weather2-weather2")
+        dmjds = numpy.array([1.0, 2.0, 2.0, 3.0, 4.0, 5.0])
+        rows = sd.FindRows(dmjds, 2.0, 4.0)
+        self.assertEquals([2.0, 2.0, 3.0, 4.0], list(dmjds[rows]))
+        self.assertEquals(0, len(dmjds[sd.FindRows(dmjds, 6.0, 7.0)]))
+        self.assertEquals(0, len(dmjds[sd.FindRows(dmjds, 0.0, 0.5)]))
+        self.assertEquals(0, len(dmjds[sd.FindRows(dmjds, 4.0, 3.0)]))
+
+        # out of order rows fall back to SelectRows
+        for dmjds, exp in [([1.0, 3.0, 2.0, 5.0, 4.0], [3.0, 2.0, 4.0])
+                         , ([5.0, 1.0, 2.0, 6.0, 7.0], [2.0])
+                         , ([1.0, 2.0, 3.0, 2.5, 5.0], [2.0, 3.0, 2.5])]:
+            dmjds = numpy.array(dmjds)
+            self.assertEquals(exp, list(dmjds[sd.FindRows(dmjds, 2.0, 4.0)]))
+
+    def testUnsortedLog(self):
+        # a log with an hour's rows written out of order
+        dir = tempfile.mkdtemp()
+        os.mkdir(dir + "/Unsorted")
+        dmjd = 53776.0 + numpy.arange(86400) / 86400.0
+        dmjd[43200:46800] = dmjd[43200:46800][::-1].copy()
+        cols = [pyfits.Column(name = 'DMJD', format = 'D', array = dmjd)
+              , pyfits.Column(name = 'SPEED', format = 'D'
+                            , array = numpy.arange(86400) * 0.5)]
+        path = dir + "/Unsorted/2006_02_10_00:00:00.fits"
+        pyfits.new_table(cols).writeto(path)
+
+        dates = ((2006, 2, 10, 11, 30, 0), (2006, 2, 10, 12, 30, 0))
+        for cache, mtime in [(False, None), (True, (1000, 1000))]:
+            if mtime is not None:
+                os.utime(path, mtime)
+            sd = SamplerData("Unsorted", memmap = True, cache = cache)
+            sd.roots = [dir]
+            sd.SetLogDirectory(dir + "/Unsorted")
+            sd.ReadColumnInfo()
+            x, y = sd.GetPlotData(dates, (0, 1), ('X', 'Y1'))
+            self.assertEquals(3601, len(x))
+            # SPEED is twice the row number
+            self.assertEquals(range(41400, 43200) + range(44999, 46800)
+                            , [int(v * 2) for v in y])
+        shutil.rmtree(dir)
+
     def testGetLatestData(self):
         sd = SamplerData("Weather-Weather2-weather2")
         now = datetime.utcnow()
@@ -0,0 +1,148 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+# 
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from SamplerLogCache import SamplerLogCache
+import unittest
+import numpy
+import os
+import pyfits
+import tempfile
+import shutil
+
+class TestSamplerLogCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log1 = self.write("2006_02_10_00:00:00.fits", 53776.0)
+        self.log2 = self.write("2006_02_11_00:00:00.fits", 53777.0)
+        self.cache = SamplerLogCache()
+        self.reads = []
+        read = self.cache.read
+        def countingRead(path, columns):
+            self.reads.append((path, columns))
+            return read(path, columns)
+        self.cache.read = countingRead
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, mjd, rows = 100):
+        path = self.dir + "/" + name
+        dmjd = mjd + numpy.arange(rows) / 86400.0
+        cols = [pyfits.Column(name = 'DMJD', format = 'D', array = dmjd)
+              , pyfits.Column(name = 'SPEED', format = 'D'
+                            , array = numpy.arange(rows) * 0.5)]
+        if os.path.exists(path):
+            os.remove(path)
+        pyfits.new_table(cols).writeto(path)
+        return path
+
+    def testGetColumns(self):
+        dmjd, speed = self.cache.getColumns(self.log1, [0, 1])
+        self.assertEquals(100, len(dmjd))
+        self.assertEquals(53776.0, dmjd[0])
+        self.assertEquals(1.5, speed[3])
+        self.assertEquals(1, len(self.reads))
+
+        # read once, however we ask for them
+        speed, dmjd, again = self.cache.getColumns(self.log1, [1, 0, 0])
+        self.assertEquals(1.5, speed[3])
+        self.assertEquals(53776.0, again[0])
+        self.assertEquals(1, len(self.reads))
+        self.assertEquals(2 * 100 * 8, self.cache.nbytes)
+
+        # only the columns we don't have are read
+        self.cache.clear()
+        self.cache.getColumns(self.log1, [0])
+        self.cache.getColumns(self.log1, [0, 1])
+        self.assertEquals((self.log1, [1]), self.reads[-1])
+
+    def testChanged(self):
+        self.cache.getColumns(self.log1, [0])
+        self.write("2006_02_10_00:00:00.fits", 53776.0, rows = 200)
+        os.utime(self.log1, (1000, 1000))
+        dmjd, = self.cache.getColumns(self.log1, [0])
+        self.assertEquals(200, len(dmjd))
+        self.assertEquals(2, len(self.reads))
+        self.assertEquals(200 * 8, self.cache.nbytes)
+
+    def testEvict(self):
+        self.cache.maxBytes = 3 * 100 * 8
+        self.cache.getColumns(self.log1, [0, 1])
+        self.cache.getColumns(self.log2, [0])
+        self.assertEquals(2, len(self.reads))
+
+        # using log1's DMJD keeps it, so its SPEED is the one to go
+        self.cache.getColumns(self.log1, [0])
+        self.cache.getColumns(self.log2, [1])
+        self.assertEquals(3 * 100 * 8, self.cache.nbytes)
+        self.assertEquals(3, len(self.reads))
+        self.cache.getColumns(self.log1, [0])
+        self.cache.getColumns(self.log2, [0, 1])
+        self.assertEquals(3, len(self.reads))
+        self.cache.getColumns(self.log1, [1])
+        self.assertEquals((self.log1, [1]), self.reads[-1])
+
+    def testIsStable(self):
+        self.assertFalse(self.cache.isStable(self.log1))
+        os.utime(self.log1, (1000, 1000))
+        self.assertTrue(self.cache.isStable(self.log1))
+
+    def testDisk(self):
+        self.cache.dir = self.dir + "/cache"
+        os.mkdir(self.cache.dir)
+
+        # logs still being written aren't saved
+        self.cache.getColumns(self.log1, [0])
+        self.assertEquals([], os.listdir(self.cache.dir))
+
+        os.utime(self.log1, (1000, 1000))
+        self.cache.getColumns(self.log1, [0, 1])
+        self.assertEquals(2, len(os.listdir(self.cache.dir)))
+        self.assertEquals(2, len(self.reads))
+
+        # a fresh start maps them, rather than reading the log
+        self.cache.clear()
+        dmjd, speed = self.cache.getColumns(self.log1, [0, 1])
+        self.assertEquals(2, len(self.reads))
+        self.assertTrue(isinstance(dmjd, numpy.memmap))
+        self.assertEquals(53776.0, dmjd[0])
+        self.assertEquals(1.5, speed[3])
+        # these are paged in as needed, so don't use up maxBytes
+        self.assertEquals(0, self.cache.nbytes)
+
+        # a changed log replaces what was saved
+        self.write("2006_02_10_00:00:00.fits", 53776.0, rows = 200)
+        os.utime(self.log1, (2000, 2000))
+        dmjd, = self.cache.getColumns(self.log1, [0])
+        self.assertEquals(200, len(dmjd))
+        self.assertEquals(3, len(self.reads))
+        names = os.listdir(self.cache.dir)
+        self.assertEquals(2, len(names))
+        self.assertEquals(1, len([n for n in names
+                                    if n.endswith("_2000.000000_0.npy")]))
+
+if __name__ == "__main__":
+    unittest.main()
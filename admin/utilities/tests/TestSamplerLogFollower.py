@@ -0,0 +1,106 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+# 
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from SamplerData        import SamplerData
+from SamplerLogFollower import SamplerLogFollower
+from datetime           import datetime, timedelta
+import unittest
+import numpy
+import os
+import pyfits
+import tempfile
+import shutil
+
+class TestSamplerLogFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.logs = self.dir + "/Test"
+        os.mkdir(self.logs)
+        # a day of samples every 10 seconds, and 10 minutes of the next
+        self.write("2006_02_10_00:00:00.fits", 53776.0, 8640)
+        self.write("2006_02_11_00:00:00.fits", 53777.0, 60)
+        self.sd = SamplerData("Test", cache = False)
+        self.sd.roots = [self.dir]
+        self.sd.SetLogDirectory("/home/gbtlogs/Test")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, mjd, rows):
+        path = self.logs + "/" + name
+        dmjd = mjd + numpy.arange(rows) * 10 / 86400.0
+        cols = [pyfits.Column(name = 'DMJD', format = 'D', array = dmjd)
+              , pyfits.Column(name = 'SPEED', format = 'D'
+                            , array = numpy.arange(rows) * 0.5)]
+        if os.path.exists(path):
+            os.remove(path)
+        pyfits.new_table(cols).writeto(path)
+
+    def testPoll(self):
+        f = SamplerLogFollower(self.sd, [1])
+
+        # the last hour: the end of one log and the start of the next
+        count = f.poll(datetime(2006, 2, 11, 0, 10, 5))
+        self.assertEquals(299 + 60, count)
+        mjd, speed = f.getData()
+        self.assertEquals(359, len(mjd))
+        self.assertAlmostEquals(53776.0 + 8341 * 10 / 86400.0, mjd[0], 9)
+        self.assertEquals(8341 * 0.5, speed[0])
+        self.assertEquals(59 * 0.5, speed[-1])
+
+        # only new rows are read, and old ones are dropped
+        self.write("2006_02_11_00:00:00.fits", 53777.0, 90)
+        count = f.poll(datetime(2006, 2, 11, 0, 15, 5))
+        self.assertEquals(30, count)
+        self.assertEquals(90, f.row)
+        mjd, speed = f.getData()
+        self.assertEquals(269 + 90, len(mjd))
+        self.assertEquals(8371 * 0.5, speed[0])
+        self.assertEquals(89 * 0.5, speed[-1])
+        self.assertTrue(numpy.all(mjd[1:] > mjd[:-1]))
+
+        self.assertEquals(0, f.poll(datetime(2006, 2, 11, 0, 15, 5)))
+
+        # on to a new log
+        self.write("2006_02_11_00:00:00.fits", 53777.0, 120)
+        self.write("2006_02_11_00:20:00.fits", 53777.0 + 120 * 10 / 86400.0, 6)
+        os.utime(self.logs, (1000, 1000))
+        count = f.poll(datetime(2006, 2, 11, 0, 21, 5))
+        self.assertEquals(30 + 6, count)
+        self.assertEquals(self.logs + "/2006_02_11_00:20:00.fits", f.path)
+        mjd, speed = f.getData()
+        self.assertEquals(5 * 0.5, speed[-1])
+        self.assertEquals(233 + 120 + 6, len(mjd))
+
+    def testNoLogs(self):
+        shutil.rmtree(self.logs)
+        f = SamplerLogFollower(self.sd, [1])
+        self.assertEquals(0, f.poll(datetime(2006, 2, 11)))
+        mjd, speed = f.getData()
+        self.assertEquals(0, len(mjd))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright (C) 2011 Associated Universities, Inc. Washington DC, USA.
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+# 
+# Correspondence concerning GBT software should be addressed as follows:
+#       GBT Operations
+#       National Radio Astronomy Observatory
+#       P. O. Box 2
+#       Green Bank, WV 24944-0002 USA
+
+if __name__ == "__main__":
+    import sys
+    sys.path[1:1] = [".."]
+
+from SamplerLogIndex import SamplerLogIndex
+import unittest
+import os
+import tempfile
+import shutil
+
+class TestSamplerLogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.old = self.dir + "/old"
+        self.new = self.dir + "/new"
+        os.mkdir(self.old)
+        os.mkdir(self.new)
+        for name in ["2006_02_10_00:00:00.fits", "2006_02_11_00:00:00.fits"]:
+            self.touch(self.old, name)
+        for name in ["2006_02_11_00:00:00.fits", "2006_02_12_00:00:00.fits"
+                   , "README"]:
+            self.touch(self.new, name)
+        self.index = SamplerLogIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def touch(self, dir, name):
+        open(dir + "/" + name, 'w').close()
+
+    def testGetLogFiles(self):
+        keys, paths = self.index.getLogFiles([self.old, self.new])
+        self.assertEquals(["2006_02_10_00:00:00.fits"
+                         , "2006_02_11_00:00:00.fits"
+                         , "2006_02_12_00:00:00.fits"], keys)
+        # the last directory wins
+        self.assertEquals(self.new + "/2006_02_11_00:00:00.fits"
+                        , paths["2006_02_11_00:00:00.fits"])
+
+        # nothing changed, nothing read
+        again, _ = self.index.getLogFiles([self.old, self.new])
+        self.assertTrue(again is keys)
+
+        # a new log is picked up once the directory's mtime changes
+        self.touch(self.new, "2006_02_13_00:00:00.fits")
+        os.utime(self.new, (0, 0))
+        keys, paths = self.index.getLogFiles([self.old, self.new])
+        self.assertEquals("2006_02_13_00:00:00.fits", keys[-1])
+
+        self.assertEquals(([], {}), self.index.getLogFiles([self.dir + "/x"]))
+
+    def testGetRange(self):
+        keys = ["2006_02_10_00:00:00.fits", "2006_02_11_00:00:00.fits"
+              , "2006_02_12_00:00:00.fits", "2006_02_13_00:00:00.fits"]
+        r = self.index.getRange
+        # from the log before the start, to the first log after the end
+        self.assertEquals((1, 2), r(keys, "2006_02_11_12:00:00"
+                                        , "2006_02_11_18:00:00"))
+        self.assertEquals((1, 3), r(keys, "2006_02_12_00:00:00"
+                                        , "2006_02_12_12:00:00"))
+        self.assertEquals((0, 0), r(keys, "2006_01_01_00:00:00"
+                                        , "2006_01_02_00:00:00"))
+        self.assertEquals((3, 4), r(keys, "2006_03_01_00:00:00"
+                                        , "2006_03_02_00:00:00"))
+        self.assertEquals((0, 0), r([], "2006_03_01_00:00:00"
+                                      , "2006_03_02_00:00:00"))
+
+if __name__ == "__main__":
+    unittest.main()
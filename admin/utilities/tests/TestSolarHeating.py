@@ -97,6 +97,19 @@ class TestSolarHeating(unittest.TestCase):
         self.assertEquals(True, self.sh.isDayTime(beforeSetDt))
         self.assertEquals(False,  self.sh.isDayTime(afterSetDt))
 
+    def testIsDayTimes(self):
+
+        # every quarter hour over a few days, around a change in the
+        # sun set's UTC day (see testGetSunRiseSet)
+        start = datetime(2010, 4, 18)
+        dts = [start + timedelta(minutes = 15 * i) for i in range(4*24*4)]
+
+        exp = [SolarHeating().isDayTime(dt) for dt in dts]
+        self.assertEquals(exp, list(self.sh.isDayTimes(dts)))
+        # the sun was only consulted once for each day
+        self.assertEquals(4, len(self.sh.boundsCache))
+        self.assertEquals(0, len(self.sh.isDayTimes([])))
+
     def testGetSunRiseSet(self):
 
         # according to:
@@ -24,6 +24,7 @@ import pg
 import sys
 import settings
 from datetime import *
+from utilities.DateRegistry import DateRegistry
 
 class WeatherHealth:
 
@@ -50,6 +51,7 @@ class WeatherHealth:
         self.dbname = dbname # ex: "weather"
 
         self.cnn = pg.connect(user = "dss", dbname = dbname, port = settings.DATABASE_PORT)
+        self.registries = {}
         
         self.sixHourForecastStart = datetime(2007, 10, 5)
 
@@ -371,6 +373,10 @@ class WeatherHealth:
         self.checkMissingWeatherDates()
         for b, e, d in self.missingWeatherDates:
             print "Filling gap between %s to %s for %d hours\n" % (b, e, d)
+            # the gap, and where we'll be copying forecasts from
+            self.registry("weather_dates").preload(b - timedelta(days = 365)
+                                                 , e - timedelta(days = 365))
+            self.registry("weather_dates").preload(b - timedelta(days = 1), e)
             if d > 3*24:
                 # get best forecasts from last year
                 self.fillLargeGap(import_id, b, e, d)
@@ -439,9 +445,7 @@ class WeatherHealth:
                           }, ... ]
          }
         """
-        query = "SELECT id FROM weather_dates WHERE date = '%s'" % hour.strftime(self.dtFormat)
-        r = self.cnn.query(query)
-        w_id = r.dictresult()[0]["id"]
+        w_id = self.registry("weather_dates").find(hour.strftime(self.dtFormat))
         query = "SELECT id, weather_date_id, forecast_time_id, wind_speed, wind_speed_mph, irradiance FROM forecasts WHERE weather_date_id = %d ORDER BY forecast_type_id" % w_id
         r = self.cnn.query(query)
         f_id = r.dictresult()[0]["id"]
@@ -473,6 +477,7 @@ class WeatherHealth:
         query = """INSERT
                    INTO forecasts (forecast_type_id, weather_date_id, forecast_time_id, import_time_id, wind_speed, wind_speed_mph, irradiance)
                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
                 """ % (bogus_forecat_type_id
                      , weather_date_id
                      , value['forecast_time_id']
@@ -481,10 +486,7 @@ class WeatherHealth:
                      , value['wind_speed_mph']
                      , value['irradiance']
                       )
-        self.cnn.query(query)
-
-        # Get the id of the forecast just inserted
-        r  = self.cnn.query('SELECT id from forecasts ORDER BY id DESC LIMIT 1')
+        r = self.cnn.query(query)
         return r.dictresult()[0]["id"]
 
     def addForecastByFrequency(self, id, values):
@@ -590,6 +592,15 @@ class WeatherHealth:
         r = self.cnn.query(query)
         print "Deleted this many weather_dates: ", r
 
+        # what we remember about the dates may no longer be true
+        self.registries = {}
+
+
+    def registry(self, table):
+        "Our date registry for the given table."
+        if not self.registries.has_key(table):
+            self.registries[table] = DateRegistry(self.cnn, table)
+        return self.registries[table]
 
     def addTimeToDB(self, timestamp, table):
         """
@@ -597,24 +608,7 @@ class WeatherHealth:
         table.  If it doesn't exist, create it.
         In any case returns it's ID.
         """
-
-        select_query = "SELECT id FROM %s WHERE date = '%s'" % \
-            (table, timestamp)
-        insert_query = "INSERT INTO %s (date) VALUES ('%s')" % \
-            (table, timestamp)
-
-        # timestamp already exists?
-        r = self.cnn.query(select_query)
-        if len(r.dictresult()) == 0:
-            # it doesn't, insert it
-            self.cnn.query(insert_query)
-            # now get the id of what we just created
-            r = self.cnn.query(select_query) 
-        else:
-            print "%s time %s already exits!" % (table, timestamp)
-
-        return r.dictresult()[0]["id"]
-           
+        return self.registry(table).get(timestamp)
 
 if __name__ == '__main__':
     dbname = sys.argv[1]